@@ -0,0 +1,314 @@
+"""
+Scanner throughput benchmark.
+
+Fills an in-process Mongo stand-in (mongomock) or a local mongod with a synthetic
+dataset, runs DeadlineScanner.scan_deadlines at a frozen clock with a no-op
+notification service, and writes the measurements as JSON so runs can be compared
+across commits. mongomock has no real indexes, so use it for round trip and memory
+comparisons and a local mongod for throughput numbers.
+
+Usage:
+    pip install mongomock
+    python benchmarks/scanner_benchmark.py --users 10000 --personal 100000 --government 2000
+    python benchmarks/scanner_benchmark.py --mongo-uri mongodb://localhost:27017 --output run.json
+    python benchmarks/scanner_benchmark.py --mongo-uri mongodb://localhost:27017 --engine async
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pymongo
+from pymongo import monitoring
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.extend([str(project_root), str(project_root / 'src')])
+
+# Noon today, fixed for the whole run; a date in the past would let TTL indexes expire the dataset
+FROZEN_NOW = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return FROZEN_NOW
+
+    @classmethod
+    def utcnow(cls):
+        return FROZEN_NOW
+
+class RoundTripCounter(monitoring.CommandListener):
+    # Counts commands sent to a real mongod
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+class MongomockRoundTrips:
+    # mongomock has no command monitoring, so count calls on the collection API instead
+    METHODS = [
+        'find', 'find_one', 'insert_one', 'insert_many', 'update_one', 'update_many',
+        'delete_one', 'delete_many', 'count_documents', 'aggregate', 'bulk_write', 'distinct'
+    ]
+
+    def __init__(self):
+        self.count = 0
+
+    def install(self):
+        import mongomock
+        counter = self
+        for name in self.METHODS:
+            original = getattr(mongomock.collection.Collection, name)
+
+            def counted(self, *args, _original=original, **kwargs):
+                counter.count += 1
+                return _original(self, *args, **kwargs)
+
+            setattr(mongomock.collection.Collection, name, counted)
+
+class NoopNotificationService:
+    # Accepts every send immediately so only scanner and database costs are measured
+    def __init__(self):
+        self.reset_dispatch_results()
+
+    def reset_dispatch_results(self):
+        self.dispatch_results = {'email': {'sent': 0, 'failed': 0}, 'sms': {'sent': 0, 'failed': 0}}
+
+    def _send(self, channel, on_result):
+        self.dispatch_results[channel]['sent'] += 1
+        if on_result:
+            on_result(True)
+
+    def queue_email_notification(self, recipient, subject, message, on_result=None, retry=False):
+        self._send('email', on_result)
+
+    def queue_sms_notification(self, phone_number, message, on_result=None, retry=False):
+        self._send('sms', on_result)
+
+    def drain(self):
+        return {channel: dict(counts) for channel, counts in self.dispatch_results.items()}
+
+    def dispatch_stats(self):
+        return {}
+
+    def shutdown(self):
+        pass
+
+class AsyncNoopNotificationService(NoopNotificationService):
+    # Interface of AsyncNotificationService for the asyncio engine
+    def __init__(self):
+        super().__init__()
+        # Sends complete inline, so no task is ever in flight
+        self.pending = set()
+
+    def start(self):
+        pass
+
+    async def throttle(self):
+        pass
+
+    async def drain(self):
+        return NoopNotificationService.drain(self)
+
+    async def close(self):
+        pass
+
+def connect(args):
+    # Every MongoClient the scanner creates must point at the benchmark database
+    if args.mongo_uri:
+        listener = RoundTripCounter()
+        client = pymongo.MongoClient(args.mongo_uri, event_listeners=[listener])
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("mongomock is required for the in-process benchmark: pip install mongomock")
+        listener = MongomockRoundTrips()
+        listener.install()
+        client = mongomock.MongoClient()
+    pymongo.MongoClient = lambda *a, **k: client
+    return client, listener
+
+def populate(db, outbox, args):
+    from backend.utils.partitioning import partition_bucket
+    rng = random.Random(args.seed)
+    today = FROZEN_NOW.date()
+    batch_size = 5000
+
+    def due_date():
+        return (today + timedelta(days=rng.randint(-5, args.horizon_days))).strftime("%Y-%m-%d")
+
+    for collection in ('users', 'deadlines', 'government_deadlines', 'government_subscriptions', 'reminder_outbox',
+                       'notification_deliveries', 'notification_retries', 'scanner_state',
+                       'scanner_checkpoints'):
+        db[collection].delete_many({})
+
+    user_ids = []
+    emails = []
+    for start in range(0, args.users, batch_size):
+        users = [
+            {'name': f'User {i}', 'email': f'user{i}@example.com', 'phone': f'+1555{i:07d}', 'password': 'x'}
+            for i in range(start, min(start + batch_size, args.users))
+        ]
+        user_ids.extend(db.users.insert_many(users).inserted_ids)
+        emails.extend(user['email'] for user in users)
+    db.users.create_index([('email', 1)])
+
+    for kind, collection, count in (('personal', db.deadlines, args.personal),
+                                    ('government', db.government_deadlines, args.government)):
+        collection.create_index([('due_date', 1)])
+        for start in range(0, count, batch_size):
+            deadlines = []
+            for i in range(start, min(start + batch_size, count)):
+                deadline = {'title': f'{kind} deadline {i}', 'due_date': due_date(), 'priority': 'medium'}
+                deadline['due_at'] = datetime.strptime(deadline['due_date'], "%Y-%m-%d")
+                if kind == 'personal':
+                    deadline['user_id'] = str(rng.choice(user_ids))
+                else:
+                    deadline['department'] = 'Benchmark'
+                    deadline['subscriber_count'] = min(args.fanout, len(emails))
+                deadlines.append(deadline)
+            inserted = collection.insert_many(deadlines).inserted_ids
+            rows = []
+            subscriptions = []
+            for deadline_id, deadline in zip(inserted, deadlines):
+                rows.extend(outbox.build_rows(deadline_id, kind, deadline['due_date'], today=today,
+                                              owner=deadline.get('user_id')))
+                if kind == 'government':
+                    subscriptions.extend(
+                        {'deadline_id': str(deadline_id), 'user': emails[i], 'bucket': partition_bucket(str(user_ids[i]))}
+                        for i in rng.sample(range(len(emails)), deadline['subscriber_count'])
+                    )
+            if subscriptions:
+                db.government_subscriptions.insert_many(subscriptions)
+            if rows:
+                outbox.collection.insert_many(rows)
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DeadlineScanner.scan_deadlines")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--personal', type=int, default=10000, help="personal deadlines")
+    parser.add_argument('--government', type=int, default=200, help="government deadlines")
+    parser.add_argument('--fanout', type=int, default=50, help="subscribers per government deadline")
+    parser.add_argument('--horizon-days', type=int, default=60, help="due dates are spread over this many days")
+    parser.add_argument('--digest', action='store_true', help="run the scanner in digest mode")
+    parser.add_argument('--engine', choices=['sync', 'async'], default='sync', help="scanner engine to measure")
+    # Run artifacts default to the temp directory so they never land in the working tree
+    parser.add_argument('--log-file', default=os.path.join(tempfile.gettempdir(), 'deadline_scanner_benchmark.log'),
+                        help="scanner log written through the queue handler")
+    parser.add_argument('--no-logging', action='store_true', help="disable logging for a baseline run")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--mongo-uri', help="use a local mongod instead of mongomock")
+    parser.add_argument('--output', default=os.path.join(tempfile.gettempdir(), 'scanner_benchmark.json'))
+    args = parser.parse_args()
+    if args.engine == 'async' and not args.mongo_uri:
+        sys.exit("the async engine reads through motor and needs --mongo-uri")
+
+    client, round_trips = connect(args)
+    if args.mongo_uri:
+        # Read by db_connector on import, for the motor client of the async engine
+        os.environ['MONGODB_URI'] = args.mongo_uri
+
+    from backend.utils.log_utils import configure_queue_logging
+    if args.no_logging:
+        logging.disable(logging.CRITICAL)
+    else:
+        configure_queue_logging(args.log_file)
+
+    import backend.services.deadline_scanner as deadline_scanner
+    import backend.services.reminder_outbox as reminder_outbox
+    import backend.services.delivery_ledger as delivery_ledger
+    for module in (deadline_scanner, reminder_outbox, delivery_ledger):
+        module.datetime = FrozenDatetime
+
+    if args.engine == 'async':
+        import backend.services.async_scanner as async_scanner
+        async_scanner.datetime = FrozenDatetime
+        scanner = async_scanner.AsyncDeadlineScanner(digest=args.digest)
+        scanner.notification_service = AsyncNoopNotificationService()
+    else:
+        scanner = deadline_scanner.DeadlineScanner(digest=args.digest)
+        scanner.notification_service = NoopNotificationService()
+    scanner.retry_queue.notification_service = NoopNotificationService()
+
+    if not args.mongo_uri:
+        # mongomock checks TTL and unique indexes by walking every document on each write,
+        # which would dominate the measurement; neither matters within a single run
+        for name in ('reminder_outbox', 'notification_deliveries', 'government_subscriptions'):
+            collection = deadline_scanner.db[name]
+            for index_name, index in collection.index_information().items():
+                if 'expireAfterSeconds' in index or index.get('unique'):
+                    collection.drop_index(index_name)
+
+    started = time.perf_counter()
+    populate(deadline_scanner.db, scanner.reminder_outbox, args)
+    populate_seconds = time.perf_counter() - started
+
+    round_trips.count = 0
+    started = time.perf_counter()
+    summary = scanner.scan_deadlines(FROZEN_NOW, "benchmark")
+    scan_seconds = time.perf_counter() - started
+    db_round_trips = round_trips.count
+
+    # tracemalloc slows the scan down, so peak memory comes from a second run on a cleared ledger
+    deadline_scanner.db.notification_deliveries.delete_many({})
+    tracemalloc.start()
+    scanner.scan_deadlines(FROZEN_NOW, "benchmark")
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # The scan only reads deadlines with due outbox rows, so throughput is measured over those
+    examined = summary['deadlines'] if summary else 0
+    result = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'backend': 'mongod' if args.mongo_uri else 'mongomock',
+        'params': {
+            'users': args.users,
+            'personal_deadlines': args.personal,
+            'government_deadlines': args.government,
+            'fanout': args.fanout,
+            'horizon_days': args.horizon_days,
+            'digest': args.digest,
+            'engine': args.engine,
+            'logging': not args.no_logging,
+            'seed': args.seed
+        },
+        'populate_seconds': round(populate_seconds, 3),
+        'scan_seconds': round(scan_seconds, 4),
+        'deadlines_examined': examined,
+        'deadlines_per_second': round(examined / scan_seconds, 1) if scan_seconds else None,
+        'db_round_trips': db_round_trips,
+        'peak_memory_bytes': peak_memory,
+        'scan_summary': summary
+    }
+
+    Path(args.output).write_text(json.dumps(result, indent=2, default=str))
+    print(json.dumps(result, indent=2, default=str))
+    client.close()
+
+if __name__ == "__main__":
+    main()
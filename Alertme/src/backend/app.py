@@ -1,17 +1,25 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, make_response
 from flask_cors import CORS
 from pymongo import MongoClient
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
+import json
+from urllib.parse import urlencode
 from dotenv import load_dotenv
 from flask_jwt_extended import (
-    JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt
+    JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt,
+    verify_jwt_in_request
 )
 from .models.deadline import DeadlineModel
 from datetime import datetime, timedelta
 from functools import wraps
 from bson.objectid import ObjectId
 from .models.personal_deadline import PersonalDeadlineModel
+from .models.subscription import GovernmentSubscriptionModel
+from .services.reminder_outbox import ReminderOutbox
+from .services.response_cache import create_response_cache
+from .utils.date_utils import to_due_at, due_at_range, due_at_filter
+from .utils.pagination import page_limit, encode_cursor, decode_cursor, keyset_filter
 
 load_dotenv()
 
@@ -44,9 +52,14 @@ ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'your_admin_password')
 users = db['users']
 
 # Create indexes
-db.government_deadlines.create_index([('subscribers', 1)])
 db.government_deadlines.create_index([('due_date', 1)])
+db.government_deadlines.create_index([('due_at', 1)])
+# Keyset pagination of the government deadline lists, optionally per department
+db.government_deadlines.create_index([('due_date', 1), ('_id', 1)])
+db.government_deadlines.create_index([('department', 1), ('due_date', 1), ('_id', 1)])
 users.create_index([('email', 1)])
+# Keyset pagination of the per-user analytics table
+users.create_index([('email', 1), ('_id', 1)])
 db.admin_settings.create_index([('email', 1)], unique=True)
 
 # Admin configuration
@@ -70,14 +83,53 @@ deadline_model = DeadlineModel()
 # Initialize models
 personal_deadline_model = PersonalDeadlineModel()
 
+# Precomputed reminder rows read by the deadline scanner
+reminder_outbox = ReminderOutbox(db.reminder_outbox)
+
+# Government deadline subscriptions, one document per subscriber
+subscription_model = GovernmentSubscriptionModel(db)
+
+# Serialized government list pages, invalidated per deadline on every write
+response_cache = create_response_cache()
+
+# Version stamps of the polled deadline lists: 'government' and 'personal:<user id>'
+list_revisions = response_cache.revisions(db.list_revisions)
+
+def list_etag(key, identity=None):
+    # Read before querying, so a write racing the query only costs the client a full fetch
+    return list_revisions.etag(key, f"{identity}?{request.query_string.decode('utf-8')}")
+
+def not_modified(etag):
+    # 304 answered from the revision counter alone, without touching Mongo
+    if etag in request.if_none_match:
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def tagged(body, etag):
+    # body is a dict, or JSON bytes straight from the response cache
+    if isinstance(body, bytes):
+        response = app.response_class(body, mimetype='application/json')
+    else:
+        response = make_response(jsonify(body))
+    response.set_etag(etag)
+    # Clients keep the body but revalidate on every poll
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 # Personal deadlines routes
 @app.route('/api/personal-deadlines', methods=['GET'])
 @jwt_required()
 def get_personal_deadlines():
     try:
         user_id = get_jwt_identity()
+        etag = list_etag(f'personal:{user_id}', user_id)
+        cached = not_modified(etag)
+        if cached:
+            return cached
         deadlines = personal_deadline_model.get_user_deadlines(user_id)
-        return jsonify(deadlines)
+        return tagged(deadlines, etag)
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -113,6 +165,7 @@ def create_personal_deadline():
         
         # Create deadline
         deadline_id = personal_deadline_model.create_deadline(deadline_data)
+        list_revisions.bump(f'personal:{current_user_id}')
         
         return jsonify({
             'message': 'Personal deadline created successfully',
@@ -134,12 +187,14 @@ def handle_personal_deadline(deadline_id):
             data = request.get_json()
             success = personal_deadline_model.update_deadline(deadline_id, data)
             if success:
+                list_revisions.bump(f'personal:{get_jwt_identity()}')
                 return jsonify({'message': 'Deadline updated successfully'})
             return jsonify({'message': 'Deadline not found'}), 404
             
         elif request.method == 'DELETE':
             success = personal_deadline_model.delete_deadline(deadline_id)
             if success:
+                list_revisions.bump(f'personal:{get_jwt_identity()}')
                 return jsonify({'message': 'Deadline deleted successfully'})
             return jsonify({'message': 'Deadline not found'}), 404
             
@@ -179,6 +234,8 @@ def signup():
     
     # Insert into main database
     user_id = users.insert_one(data).inserted_id
+    # Subscriptions made with this email before signup move to the user's scanner partition
+    subscription_model.assign_user_bucket(data['email'], user_id)
     
     # Insert into personal deadlines database
     personal_db.users.insert_one({
@@ -265,37 +322,118 @@ def handle_deadline(deadline_id):
 @jwt_required()
 def get_deadlines_by_date(date):
     user_id = get_jwt_identity()
-    deadlines = deadline_model.get_deadlines_by_date(date, user_id)
+    try:
+        deadlines = deadline_model.get_deadlines_by_date(date, user_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify(deadlines)
 
+# Fields returned by the government deadline lists; subscribers stay server-side
+GOVT_DEADLINE_LIST_PROJECTION = {
+    'title': 1, 'department': 1, 'due_date': 1, 'priority': 1, 'description': 1, 'subscriber_count': 1
+}
+
+def government_deadline_page(args):
+    # One page in (due_date, _id) order. Query args: limit, next, department, from, to
+    # (YYYY, YYYY-MM or YYYY-MM-DD; to is inclusive). ValueError on a malformed date
+    limit = page_limit(args.get('limit'))
+    conditions = []
+    if args.get('department'):
+        conditions.append({'department': args['department']})
+    start = due_at_range(args['from'])[0] if args.get('from') else None
+    end = due_at_range(args['to'])[1] if args.get('to') else None
+    if start or end:
+        conditions.append(due_at_filter(start, end))
+    if args.get('next'):
+        conditions.append(keyset_filter(args['next']))
+    query = {'$and': conditions} if conditions else {}
+
+    # One extra row tells whether another page exists
+    deadlines = list(
+        db.government_deadlines.find(query, GOVT_DEADLINE_LIST_PROJECTION)
+        .sort([('due_date', 1), ('_id', 1)])
+        .limit(limit + 1)
+    )
+    next_token = None
+    if len(deadlines) > limit:
+        deadlines = deadlines[:limit]
+        next_token = encode_cursor(deadlines[-1].get('due_date'), deadlines[-1]['_id'])
+    # Deadlines the subscription migration has not reached carry no subscriber_count yet
+    uncounted = [d['_id'] for d in deadlines if 'subscriber_count' not in d]
+    counts = subscription_model.subscriber_counts(uncounted) if uncounted else {}
+    formatted_deadlines = [{
+        'id': str(d['_id']),
+        'title': d.get('title', ''),
+        'department': d.get('department', ''),
+        'due_date': d.get('due_date', ''),
+        'priority': d.get('priority', ''),
+        'description': d.get('description', ''),
+        'subscriber_count': d.get('subscriber_count', counts.get(str(d['_id']), 0))
+    } for d in deadlines]
+    return {'deadlines': formatted_deadlines, 'next': next_token}
+
+GOVT_DEADLINE_PAGE_ARGS = ('limit', 'next', 'department', 'from', 'to')
+
+def cached_government_deadline_page(args):
+    # JSON bytes of government_deadline_page, served from response_cache when present
+    key = 'government:' + urlencode(sorted((k, args[k]) for k in GOVT_DEADLINE_PAGE_ARGS if args.get(k)))
+    body = response_cache.get(key)
+    if body is not None:
+        return body
+    generation = response_cache.generation()
+    page = government_deadline_page(args)
+    body = json.dumps(page).encode('utf-8')
+    # The due_date range the page spans, so writes elsewhere in the list leave it cached
+    rows = page['deadlines']
+    response_cache.set(key, body, {
+        'ids': [d['id'] for d in rows],
+        'lo': decode_cursor(args['next'])[0] if args.get('next') else None,
+        'hi': rows[-1]['due_date'] if page['next'] else None
+    }, generation)
+    return body
+
+def caller_email():
+    # Email of the user behind the request's token; None for anonymous callers,
+    # unusable tokens and the admin identity
+    try:
+        verify_jwt_in_request(optional=True)
+    except Exception:
+        return None
+    identity = get_jwt_identity()
+    if not identity or not ObjectId.is_valid(identity):
+        return None
+    user = users.find_one({'_id': ObjectId(identity)}, {'email': 1})
+    return user.get('email') if user else None
+
 # Government deadline routes
 @app.route('/admin/api/government-deadlines', methods=['GET', 'POST'])
 @admin_required
 def admin_government_deadlines():
     try:
         if request.method == 'GET':
-            deadlines = list(db.government_deadlines.find())
-            formatted_deadlines = [{
-                'id': str(d['_id']),
-                'title': d.get('title', ''),
-                'department': d.get('department', ''),
-                'due_date': d.get('due_date', ''),
-                'priority': d.get('priority', ''),
-                'description': d.get('description', ''),
-                'subscribers': d.get('subscribers', [])
-            } for d in deadlines]
-            return jsonify({'deadlines': formatted_deadlines})
+            try:
+                body = cached_government_deadline_page(request.args)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return app.response_class(body, mimetype='application/json')
             
         elif request.method == 'POST':
             data = request.get_json()
             data['created_at'] = datetime.utcnow().isoformat()
-            data['subscribers'] = []
+            data['due_at'] = to_due_at(data.get('due_date'))
+            data['subscriber_count'] = 0
             result = db.government_deadlines.insert_one(data)
+            reminder_outbox.plan(result.inserted_id, 'government', data.get('due_date'))
+            response_cache.invalidate_deadline(due_date=data.get('due_date') or '')
+            list_revisions.bump('government')
             return jsonify({
                 'id': str(result.inserted_id),
                 'message': 'Government deadline created successfully'
             }), 201
             
+    except ValueError as e:
+        # Bad limit or next token
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -306,6 +444,10 @@ def admin_handle_govt_deadline(deadline_id):
         if request.method == 'DELETE':
             result = db.government_deadlines.delete_one({'_id': ObjectId(deadline_id)})
             if result.deleted_count:
+                reminder_outbox.cancel(deadline_id)
+                subscription_model.delete_deadline(deadline_id)
+                response_cache.invalidate_deadline(deadline_id)
+                list_revisions.bump('government')
                 return jsonify({'message': 'Deadline deleted successfully'}), 200
             return jsonify({'message': 'Deadline not found'}), 404
             
@@ -317,12 +459,17 @@ def admin_handle_govt_deadline(deadline_id):
                     'title': data['title'],
                     'department': data['department'],
                     'due_date': data['due_date'],
+                    'due_at': to_due_at(data['due_date']),
                     'priority': data['priority'],
                     'description': data['description'],
                     'updated_at': datetime.utcnow().isoformat()
                 }}
             )
             if result.modified_count:
+                reminder_outbox.plan(deadline_id, 'government', data['due_date'])
+                # Pages holding its old position, and those its new due date falls in
+                response_cache.invalidate_deadline(deadline_id, data['due_date'])
+                list_revisions.bump('government')
                 return jsonify({'message': 'Deadline updated successfully'}), 200
             return jsonify({'message': 'Deadline not found'}), 404
             
@@ -332,17 +479,28 @@ def admin_handle_govt_deadline(deadline_id):
 @app.route('/api/government-deadlines/public', methods=['GET'])
 def get_public_government_deadlines():
     try:
-        deadlines = list(db.government_deadlines.find())
-        formatted_deadlines = [{
-            'id': str(d['_id']),
-            'title': d.get('title', ''),
-            'department': d.get('department', ''),
-            'due_date': d.get('due_date', ''),
-            'priority': d.get('priority', ''),
-            'description': d.get('description', ''),
-            'subscribers': d.get('subscribers', [])
-        } for d in deadlines]
-        return jsonify({'deadlines': formatted_deadlines})
+        # Rows carry the caller's is_subscribed, so the tag varies by token identity
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except Exception:
+            identity = None
+        etag = list_etag('government', identity)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        body = cached_government_deadline_page(request.args)
+        # Authenticated callers also get is_subscribed per row, so clients never need subscriber lists
+        user_email = caller_email()
+        if not user_email:
+            return tagged(body, etag)
+        page = json.loads(body)
+        subscribed = subscription_model.subscribed_ids(user_email, [d['id'] for d in page['deadlines']])
+        for deadline in page['deadlines']:
+            deadline['is_subscribed'] = deadline['id'] in subscribed
+        return tagged(page, etag)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -357,12 +515,18 @@ def subscribe_to_govt_deadline(deadline_id):
         if not user_email:
             return jsonify({'message': 'Email is required'}), 400
 
-        deadline = db.government_deadlines.find_one({'_id': ObjectId(deadline_id)})
+        deadline = db.government_deadlines.find_one({'_id': ObjectId(deadline_id)}, {'_id': 1})
         if not deadline:
             return jsonify({'message': 'Deadline not found'}), 404
 
-        operation = {'$push': {'subscribers': user_email}} if subscribed else {'$pull': {'subscribers': user_email}}
-        db.government_deadlines.update_one({'_id': ObjectId(deadline_id)}, operation)
+        if subscribed:
+            changed = subscription_model.subscribe(deadline_id, user_email)
+        else:
+            changed = subscription_model.unsubscribe(deadline_id, user_email)
+        if changed:
+            # subscriber_count and is_subscribed are part of the public list
+            response_cache.invalidate_deadline(deadline_id)
+            list_revisions.bump('government')
 
         return jsonify({
             'message': 'Subscription updated successfully',
@@ -376,8 +540,11 @@ def subscribe_to_govt_deadline(deadline_id):
 @jwt_required()
 def get_subscribed_deadlines():
     try:
-        user_email = get_jwt_identity()
-        subscribed_deadlines = list(db.government_deadlines.find({'subscribers': user_email}))
+        user_email = caller_email()
+        if not user_email:
+            return jsonify({'deadlines': []})
+        deadline_ids = subscription_model.deadline_ids_for_user(user_email)
+        subscribed_deadlines = list(db.government_deadlines.find({'_id': {'$in': [ObjectId(i) for i in deadline_ids]}}))
         formatted_deadlines = [{
             'id': str(d['_id']),
             'title': d.get('title', ''),
@@ -455,23 +622,43 @@ def handle_admin_settings():
 @admin_required
 def get_admin_analytics():
     try:
+        # A fixed number of queries whatever the user count: two counts, one $group for
+        # active users, the deadline listing with one $group of its subscribers, one user page
+        # and one $group of its subscriptions
         total_users = users.count_documents({})
         total_deadlines = db.government_deadlines.count_documents({})
-        active_users = len(db.government_deadlines.distinct('subscribers'))
+        active_users = subscription_model.active_user_count()
         
+        # Counted from the subscriptions like the per-user table, so the two always agree
+        subscriber_counts = subscription_model.subscriber_counts()
         deadline_stats = [{
             'title': d.get('title', ''),
-            'total_subscribers': len(d.get('subscribers', [])),
-            'active_users': len(d.get('subscribers', [])),
+            'total_subscribers': subscriber_counts.get(str(d['_id']), 0),
+            'active_users': subscriber_counts.get(str(d['_id']), 0),
             'completion_rate': 0
-        } for d in db.government_deadlines.find()]
+        } for d in db.government_deadlines.find({}, {'title': 1})]
+        
+        # The per-user table is paged in (email, _id) order when limit or next is given
+        user_query = keyset_filter(request.args['next'], 'email') if request.args.get('next') else {}
+        user_cursor = users.find(user_query, {'name': 1, 'email': 1}).sort([('email', 1), ('_id', 1)])
+        users_next = None
+        if request.args.get('limit') or request.args.get('next'):
+            limit = page_limit(request.args.get('limit'))
+            page_users = list(user_cursor.limit(limit + 1))
+            if len(page_users) > limit:
+                page_users = page_users[:limit]
+                users_next = encode_cursor(page_users[-1].get('email'), page_users[-1]['_id'])
+            counts = subscription_model.counts_by_user(u.get('email') for u in page_users)
+        else:
+            page_users = list(user_cursor)
+            counts = subscription_model.counts_by_user()
         
         user_stats = [{
             'name': u.get('name', ''),
-            'subscribed_deadlines': db.government_deadlines.count_documents({'subscribers': u.get('email')}),
-            'active_deadlines': db.government_deadlines.count_documents({'subscribers': u.get('email')}),
+            'subscribed_deadlines': counts.get(u.get('email'), 0),
+            'active_deadlines': counts.get(u.get('email'), 0),
             'completion_rate': 0
-        } for u in users.find({}, {'password': 0})]
+        } for u in page_users]
         
         return jsonify({
             'summary': {
@@ -480,9 +667,13 @@ def get_admin_analytics():
                 'total_deadlines': total_deadlines
             },
             'deadlines': deadline_stats,
-            'users': user_stats
+            'users': user_stats,
+            'users_next': users_next
         })
         
+    except ValueError as e:
+        # Bad limit or next token
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -4,9 +4,10 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-# Initialize MongoDB client
-client = MongoClient('mongodb://your_mongodb_uri')
+# Initialize MongoDB client; every scanner connection, sync or motor, uses this URI
+MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://your_mongodb_uri')
+client = MongoClient(MONGODB_URI)
 db = client['your_database_name']
 
 # Export the db object
-__all__ = ['db']
\ No newline at end of file
+__all__ = ['db', 'MONGODB_URI']
\ No newline at end of file
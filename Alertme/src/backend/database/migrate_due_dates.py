@@ -0,0 +1,55 @@
+import logging
+import os
+import sys
+from pathlib import Path
+from pymongo import MongoClient, UpdateOne
+from dotenv import load_dotenv
+
+# Add project root to Python path
+current_dir = Path(__file__).resolve().parent
+src_path = current_dir.parent.parent
+sys.path.append(str(src_path))
+
+from backend.utils.date_utils import to_due_at
+
+load_dotenv()
+
+BATCH_SIZE = 1000
+
+def migrate_due_dates(collection, state, batch_size=BATCH_SIZE):
+    # Adds due_at (BSON date) next to the due_date string. Progress is stored per
+    # collection in `state`, so an interrupted run resumes where it stopped.
+    state_id = f"due_at:{collection.database.name}.{collection.name}"
+    progress = state.find_one({'_id': state_id}) or {}
+    last_id = progress.get('last_id')
+    migrated = progress.get('migrated', 0)
+
+    while True:
+        query = {'due_at': {'$exists': False}}
+        if last_id is not None:
+            query['_id'] = {'$gt': last_id}
+        batch = list(collection.find(query, {'due_date': 1}).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+        updates = [
+            UpdateOne({'_id': doc['_id']}, {'$set': {'due_at': to_due_at(doc.get('due_date'))}})
+            for doc in batch
+        ]
+        collection.bulk_write(updates, ordered=False)
+        last_id = batch[-1]['_id']
+        migrated += len(batch)
+        state.update_one({'_id': state_id}, {'$set': {'last_id': last_id, 'migrated': migrated}}, upsert=True)
+        logging.info(f"{collection.name}: migrated {migrated} documents")
+
+    collection.create_index([('due_at', 1)])
+    state.update_one({'_id': state_id}, {'$set': {'completed': True}}, upsert=True)
+    return migrated
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://your_mongodb_uri'))
+    db = client[os.getenv('DB_NAME', 'your_database_name')]
+    personal_db = client[os.getenv('PERSONAL_DB_NAME', 'your_personal_db')]
+    for target in (db.government_deadlines, db.deadlines, personal_db.deadlines):
+        count = migrate_due_dates(target, db.migrations)
+        print(f"{target.database.name}.{target.name}: {count} documents migrated")
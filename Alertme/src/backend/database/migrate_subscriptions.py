@@ -0,0 +1,59 @@
+import logging
+import os
+import sys
+from pathlib import Path
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+# Add project root to Python path
+current_dir = Path(__file__).resolve().parent
+src_path = current_dir.parent.parent
+sys.path.append(str(src_path))
+
+from backend.models.subscription import GovernmentSubscriptionModel
+
+load_dotenv()
+
+BATCH_SIZE = 500
+
+def migrate_subscriptions(db, batch_size=BATCH_SIZE):
+    # Moves embedded government_deadlines.subscribers arrays into the
+    # government_subscriptions collection and sets subscriber_count. Each deadline
+    # drops its array once moved, so an interrupted run resumes where it stopped.
+    subscriptions = GovernmentSubscriptionModel(db)
+    state_id = f"subscriptions:{db.name}.government_deadlines"
+    progress = db.migrations.find_one({'_id': state_id}) or {}
+    migrated = progress.get('migrated', 0)
+    moved = progress.get('subscriptions', 0)
+
+    while True:
+        batch = list(db.government_deadlines.find(
+            {'subscribers': {'$exists': True}}, {'subscribers': 1}
+        ).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+        for deadline in batch:
+            moved += subscriptions.migrate_embedded(deadline)
+        migrated += len(batch)
+        db.migrations.update_one(
+            {'_id': state_id},
+            {'$set': {'last_id': batch[-1]['_id'], 'migrated': migrated, 'subscriptions': moved}},
+            upsert=True
+        )
+        logging.info(f"government_deadlines: migrated {migrated} deadlines, {moved} subscriptions")
+
+    # Deadlines created before the migration without any subscribers
+    db.government_deadlines.update_many({'subscriber_count': {'$exists': False}}, {'$set': {'subscriber_count': 0}})
+    # Subscriptions written before the scanner partition bucket was stored on them
+    backfilled = subscriptions.backfill_buckets()
+    if backfilled:
+        logging.info(f"government_subscriptions: stored partition buckets on {backfilled} subscriptions")
+    db.migrations.update_one({'_id': state_id}, {'$set': {'completed': True}}, upsert=True)
+    return migrated
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://your_mongodb_uri'))
+    db = client[os.getenv('DB_NAME', 'your_database_name')]
+    count = migrate_subscriptions(db)
+    print(f"{db.name}.government_deadlines: {count} deadlines migrated")
@@ -1,7 +1,7 @@
 from pymongo import MongoClient
 from bson import ObjectId
 from datetime import datetime
-import re
+from ..utils.date_utils import to_due_at, due_at_range, due_at_filter
 
 class DeadlineModel:
     def __init__(self):
@@ -14,6 +14,7 @@ class DeadlineModel:
             # Create indexes
             self.collection.create_index([('user_id', 1)])
             self.collection.create_index([('due_date', 1)])
+            self.collection.create_index([('user_id', 1), ('due_at', 1)])
         except Exception as e:
             raise Exception(f"Failed to connect to MongoDB: {str(e)}")
 
@@ -24,10 +25,11 @@ class DeadlineModel:
                 if not deadline_data.get(field):
                     raise ValueError(f"Missing required field: {field}")
             
-            # Validate date format (YYYY-MM-DD)
-            date_pattern = re.compile(r'^\d{4}-\d{2}-\d{2}$')
-            if not date_pattern.match(deadline_data['due_date']):
+            # Validate date format (YYYY-MM-DD) and keep a typed copy for range queries
+            due_at = to_due_at(deadline_data['due_date'])
+            if not due_at:
                 raise ValueError("Invalid date format. Use YYYY-MM-DD")
+            deadline_data['due_at'] = due_at
             
             # Set default values
             deadline_data.setdefault('priority', 'medium')
@@ -51,19 +53,21 @@ class DeadlineModel:
 
     def get_all_deadlines(self, user_id):
         try:
-            deadlines = self.collection.find({'user_id': user_id})
+            deadlines = self.collection.find({'user_id': user_id}, {'due_at': 0})
             return [{**deadline, '_id': str(deadline['_id'])} for deadline in deadlines]
         except Exception as e:
             raise Exception(f"Failed to fetch deadlines: {str(e)}")
 
     def get_deadline_by_id(self, deadline_id):
-        deadline = self.collection.find_one({'_id': ObjectId(deadline_id)})
+        deadline = self.collection.find_one({'_id': ObjectId(deadline_id)}, {'due_at': 0})
         if deadline:
             deadline['_id'] = str(deadline['_id'])
         return deadline
 
     def update_deadline(self, deadline_id, update_data):
         update_data['updated_at'] = datetime.utcnow()
+        if 'due_date' in update_data:
+            update_data['due_at'] = to_due_at(update_data['due_date'])
         self.collection.update_one(
             {'_id': ObjectId(deadline_id)},
             {'$set': update_data}
@@ -73,10 +77,10 @@ class DeadlineModel:
         self.collection.delete_one({'_id': ObjectId(deadline_id)})
 
     def get_deadlines_by_date(self, date, user_id):
-        deadlines = self.collection.find({
-            'user_id': user_id,
-            'due_date': {'$regex': f'^{date}'}
-        })
+        # Whole year, month or day (YYYY, YYYY-MM, YYYY-MM-DD); ValueError on anything else
+        # Documents the due_at migration has not reached yet are matched on due_date
+        start, end = due_at_range(date)
+        deadlines = self.collection.find({'user_id': user_id, **due_at_filter(start, end)}, {'due_at': 0})
         return [{**deadline, '_id': str(deadline['_id'])} for deadline in deadlines]
 
 class Deadline:
@@ -2,6 +2,8 @@ from pymongo import MongoClient
 from bson import ObjectId
 from datetime import datetime
 import re
+from ..services.reminder_outbox import ReminderOutbox
+from ..utils.date_utils import to_due_at
 
 class PersonalDeadlineModel:
     def __init__(self):
@@ -10,10 +12,12 @@ class PersonalDeadlineModel:
             self.db = self.client['your_database_name']
             self.collection = self.db['deadlines']
             self.users = self.db['users']
+            self.reminder_outbox = ReminderOutbox(self.db['reminder_outbox'])
             
             # Create indexes
             self.collection.create_index([('user_id', 1)])
             self.collection.create_index([('due_date', 1)])
+            self.collection.create_index([('due_at', 1)])
             self.users.create_index([('original_id', 1)], unique=True)
         except Exception as e:
             raise Exception(f"Failed to connect to MongoDB: {str(e)}")
@@ -49,14 +53,16 @@ class PersonalDeadlineModel:
             if cleaned_data['priority'] not in ['low', 'medium', 'high']:
                 raise ValueError("Invalid priority level")
 
-            # Validate date format
-            try:
-                datetime.strptime(cleaned_data['due_date'], '%Y-%m-%d')
-            except ValueError:
+            # Validate date format and keep a typed copy for range queries
+            cleaned_data['due_at'] = to_due_at(cleaned_data['due_date'])
+            if not cleaned_data['due_at']:
                 raise ValueError("Invalid date format. Use YYYY-MM-DD")
 
             # Insert the document with cleaned data
             result = self.collection.insert_one(cleaned_data)
+            self.reminder_outbox.plan(
+                result.inserted_id, 'personal', cleaned_data['due_date'], owner=cleaned_data['user_id']
+            )
             return str(result.inserted_id)
 
         except ValueError as ve:
@@ -66,7 +72,7 @@ class PersonalDeadlineModel:
 
     def get_user_deadlines(self, user_id):
         try:
-            deadlines = list(self.collection.find({'user_id': user_id}))
+            deadlines = list(self.collection.find({'user_id': user_id}, {'due_at': 0}))
             for deadline in deadlines:
                 deadline['id'] = str(deadline['_id'])
                 del deadline['_id']
@@ -77,10 +83,15 @@ class PersonalDeadlineModel:
     def update_deadline(self, deadline_id, deadline_data):
         try:
             deadline_data['updated_at'] = datetime.utcnow()
+            if 'due_date' in deadline_data:
+                deadline_data['due_at'] = to_due_at(deadline_data['due_date'])
             result = self.collection.update_one(
                 {'_id': ObjectId(deadline_id)},
                 {'$set': deadline_data}
             )
+            if result.matched_count and 'due_date' in deadline_data:
+                owner = self.collection.find_one({'_id': ObjectId(deadline_id)}, {'user_id': 1}) or {}
+                self.reminder_outbox.plan(deadline_id, 'personal', deadline_data['due_date'], owner=owner.get('user_id'))
             return result.modified_count > 0
         except Exception as e:
             raise Exception(f"Failed to update deadline: {str(e)}")
@@ -88,6 +99,8 @@ class PersonalDeadlineModel:
     def delete_deadline(self, deadline_id):
         try:
             result = self.collection.delete_one({'_id': ObjectId(deadline_id)})
+            if result.deleted_count:
+                self.reminder_outbox.cancel(deadline_id)
             return result.deleted_count > 0
         except Exception as e:
             raise Exception(f"Failed to delete deadline: {str(e)}")
\ No newline at end of file
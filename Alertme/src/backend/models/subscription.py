@@ -0,0 +1,220 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from ..utils.partitioning import partition_bucket, bucket_filter
+
+# Deadline ids per $in query when loading subscribers for many deadlines
+LOOKUP_BATCH_SIZE = 1000
+
+class GovernmentSubscriptionModel:
+    def __init__(self, db):
+        # One document per (government deadline, subscriber email); the deadline keeps
+        # a denormalized subscriber_count instead of an embedded subscribers array
+        self.collection = db['government_subscriptions']
+        self.deadlines = db['government_deadlines']
+        self.users = db['users']
+
+        self.collection.create_index([('deadline_id', ASCENDING), ('user', ASCENDING)], unique=True)
+        self.collection.create_index([('user', ASCENDING), ('deadline_id', ASCENDING)])
+        # bucket is the subscriber's scanner partition bucket (see partition_keys), so each worker
+        # loads only its share
+        self.collection.create_index([('deadline_id', ASCENDING), ('bucket', ASCENDING)])
+        # Serves the embedded arrays until migrate_subscriptions.py has emptied them
+        self.deadlines.create_index([('subscribers', ASCENDING)])
+
+    def _migrate_on_touch(self, deadline_id):
+        # A deadline still holding an embedded array is migrated before its first change, so
+        # subscriber_count starts from the real count instead of a missing field
+        deadline = self.deadlines.find_one(
+            {'_id': ObjectId(deadline_id), 'subscribers': {'$exists': True}}, {'subscribers': 1}
+        )
+        if deadline:
+            self.migrate_embedded(deadline)
+
+    def subscribe(self, deadline_id, user):
+        self._migrate_on_touch(deadline_id)
+        try:
+            self.collection.insert_one({
+                'deadline_id': str(deadline_id),
+                'user': user,
+                'bucket': partition_bucket(self.partition_keys([user])[user]),
+                'created_at': datetime.utcnow()
+            })
+        except DuplicateKeyError:
+            return False
+        self.deadlines.update_one({'_id': ObjectId(deadline_id)}, {'$inc': {'subscriber_count': 1}})
+        return True
+
+    def unsubscribe(self, deadline_id, user):
+        self._migrate_on_touch(deadline_id)
+        result = self.collection.delete_one({'deadline_id': str(deadline_id), 'user': user})
+        if result.deleted_count:
+            self.deadlines.update_one({'_id': ObjectId(deadline_id)}, {'$inc': {'subscriber_count': -1}})
+        return result.deleted_count > 0
+
+    def partition_keys(self, users):
+        # Subscribers are partitioned by user _id, as personal deadlines are by user_id, so all
+        # of one person's reminders go to the same scanner worker. Emails without an account
+        # keep the email as key until signup calls assign_user_bucket.
+        users = list(dict.fromkeys(users))
+        keys = {user: str(user) for user in users}
+        emails = [user for user in users if '@' in str(user)]
+        for start in range(0, len(emails), LOOKUP_BATCH_SIZE):
+            for account in self.users.find({'email': {'$in': emails[start:start + LOOKUP_BATCH_SIZE]}}, {'email': 1}):
+                keys[account['email']] = str(account['_id'])
+        return keys
+
+    def assign_user_bucket(self, email, user_id):
+        self.collection.update_many({'user': email}, {'$set': {'bucket': partition_bucket(str(user_id))}})
+
+    def delete_deadline(self, deadline_id):
+        self.collection.delete_many({'deadline_id': str(deadline_id)})
+
+    def _embedded_only(self, deadline_query):
+        # (deadline id, user) pairs still held only in embedded subscribers arrays.
+        # deadline_query constrains 'subscribers' so it runs on that index; once the
+        # migration has run it matches nothing.
+        pairs = set()
+        for deadline in self.deadlines.find(deadline_query, {'subscribers': 1}):
+            pairs.update((str(deadline['_id']), user) for user in deadline.get('subscribers') or [])
+        if pairs:
+            migrated = self.collection.find({
+                'deadline_id': {'$in': list({deadline_id for deadline_id, _ in pairs})},
+                'user': {'$in': list({user for _, user in pairs})}
+            }, {'_id': 0, 'deadline_id': 1, 'user': 1})
+            pairs -= {(s['deadline_id'], s['user']) for s in migrated}
+        return pairs
+
+    def deadline_ids_for_user(self, user):
+        deadline_ids = [s['deadline_id'] for s in self.collection.find({'user': user}, {'_id': 0, 'deadline_id': 1})]
+        embedded = self._embedded_only({'subscribers': user})
+        return deadline_ids + [deadline_id for deadline_id, member in embedded if member == user]
+
+    def subscribed_ids(self, user, deadline_ids):
+        # Which of one page of deadlines the user follows; served by the (user, deadline_id) index
+        if not deadline_ids:
+            return set()
+        cursor = self.collection.find(
+            {'user': user, 'deadline_id': {'$in': [str(i) for i in deadline_ids]}},
+            {'_id': 0, 'deadline_id': 1}
+        )
+        embedded = self.deadlines.find(
+            {'_id': {'$in': [ObjectId(i) for i in deadline_ids]}, 'subscribers': user},
+            {'_id': 1}
+        )
+        return {s['deadline_id'] for s in cursor} | {str(d['_id']) for d in embedded}
+
+    def subscriber_counts(self, deadline_ids=None):
+        # deadline id -> number of subscribers in one $group, embedded arrays included, for
+        # deadlines whose subscriber_count is not set yet; deadline_ids=None counts every deadline
+        pipeline = [{'$group': {'_id': '$deadline_id', 'count': {'$sum': 1}}}]
+        embedded_query = {'subscribers': {'$exists': True}}
+        if deadline_ids is not None:
+            deadline_ids = [str(deadline_id) for deadline_id in deadline_ids]
+            pipeline.insert(0, {'$match': {'deadline_id': {'$in': deadline_ids}}})
+            embedded_query['_id'] = {'$in': [ObjectId(deadline_id) for deadline_id in deadline_ids]}
+        counts = {row['_id']: row['count'] for row in self.collection.aggregate(pipeline)}
+        for deadline_id, _ in self._embedded_only(embedded_query):
+            counts[deadline_id] = counts.get(deadline_id, 0) + 1
+        return counts
+
+    def counts_by_user(self, users=None):
+        # user email -> number of subscriptions in one $group; users=None counts everyone
+        pipeline = [{'$group': {'_id': '$user', 'count': {'$sum': 1}}}]
+        if users is not None:
+            users = list(users)
+            pipeline.insert(0, {'$match': {'user': {'$in': users}}})
+        counts = {row['_id']: row['count'] for row in self.collection.aggregate(pipeline)}
+        embedded_query = {'subscribers': {'$exists': True} if users is None else {'$in': users}}
+        wanted = None if users is None else set(users)
+        for _, user in self._embedded_only(embedded_query):
+            if wanted is None or user in wanted:
+                counts[user] = counts.get(user, 0) + 1
+        return counts
+
+    def active_user_count(self):
+        # Distinct subscribers, counted server-side instead of shipping distinct() to the client
+        rows = list(self.collection.aggregate([
+            {'$group': {'_id': '$user'}},
+            {'$count': 'active_users'}
+        ]))
+        active = rows[0]['active_users'] if rows else 0
+        embedded_users = {user for _, user in self._embedded_only({'subscribers': {'$exists': True}})}
+        if embedded_users:
+            counted = set(self.collection.distinct('user', {'user': {'$in': list(embedded_users)}}))
+            active += len(embedded_users - counted)
+        return active
+
+    @staticmethod
+    def subscribers_query(deadline_ids, buckets=None):
+        # buckets limits the result to one scanner partition's subscribers
+        query = {'deadline_id': {'$in': deadline_ids}}
+        if buckets is not None:
+            query['bucket'] = bucket_filter(buckets)
+        return query, {'_id': 0, 'deadline_id': 1, 'user': 1}
+
+    def subscribers_by_deadline(self, deadline_ids, buckets=None):
+        # deadline id -> list of subscriber emails, in batched $in queries
+        deadline_ids = [str(deadline_id) for deadline_id in deadline_ids]
+        subscribers = {deadline_id: [] for deadline_id in deadline_ids}
+        for start in range(0, len(deadline_ids), LOOKUP_BATCH_SIZE):
+            batch = deadline_ids[start:start + LOOKUP_BATCH_SIZE]
+            cursor = self.collection.find(*self.subscribers_query(batch, buckets))
+            for subscription in cursor:
+                subscribers[subscription['deadline_id']].append(subscription['user'])
+        return subscribers
+
+    def attach_subscribers(self, deadlines, buckets=None):
+        # Fills deadline['subscribers'] for code that works on whole deadlines (the scanner).
+        # Embedded arrays not yet migrated are merged in.
+        return self.merge_subscribers(deadlines, self.subscribers_by_deadline([d['_id'] for d in deadlines], buckets))
+
+    @staticmethod
+    def merge_subscribers(deadlines, by_deadline):
+        for deadline in deadlines:
+            subscribers = by_deadline.get(str(deadline['_id']), [])
+            embedded = deadline.get('subscribers') or []
+            deadline['subscribers'] = list(dict.fromkeys(embedded + subscribers))
+        return deadlines
+
+    def migrate_embedded(self, deadline):
+        # Moves one deadline's embedded subscribers array into the collection
+        subscribers = list(dict.fromkeys(deadline.get('subscribers') or []))
+        if subscribers:
+            now = datetime.utcnow()
+            keys = self.partition_keys(subscribers)
+            try:
+                self.collection.insert_many([
+                    {'deadline_id': str(deadline['_id']), 'user': user, 'bucket': partition_bucket(keys[user]),
+                     'created_at': now}
+                    for user in subscribers
+                ], ordered=False)
+            except BulkWriteError:
+                # Already migrated by an earlier, interrupted run
+                pass
+        count = self.collection.count_documents({'deadline_id': str(deadline['_id'])})
+        self.deadlines.update_one(
+            {'_id': deadline['_id']},
+            {'$set': {'subscriber_count': count}, '$unset': {'subscribers': ''}}
+        )
+        return len(subscribers)
+
+    def backfill_buckets(self, batch_size=1000):
+        # (Re)computes the partition bucket of every subscription, in _id order
+        updated = 0
+        last_id = None
+        while True:
+            query = {'_id': {'$gt': last_id}} if last_id else {}
+            batch = list(self.collection.find(query, {'user': 1, 'bucket': 1}).sort('_id', 1).limit(batch_size))
+            if not batch:
+                return updated
+            keys = self.partition_keys(s['user'] for s in batch)
+            updates = [
+                UpdateOne({'_id': s['_id']}, {'$set': {'bucket': partition_bucket(keys[s['user']])}})
+                for s in batch if s.get('bucket') != partition_bucket(keys[s['user']])
+            ]
+            if updates:
+                self.collection.bulk_write(updates, ordered=False)
+            updated += len(updates)
+            last_id = batch[-1]['_id']
@@ -0,0 +1,488 @@
+from datetime import datetime
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import time
+
+import aiohttp
+import aiosmtplib
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+
+from backend.database.db_connector import db, MONGODB_URI
+from backend.models.subscription import GovernmentSubscriptionModel, LOOKUP_BATCH_SIZE
+from backend.services.deadline_scanner import (
+    DeadlineScanner, DEADLINE_LOOKUP_BATCH_SIZE, REMINDER_BATCH_SIZE, USER_LOOKUP_BATCH_SIZE, USER_PROJECTION
+)
+from backend.services.notification_service import channel_rate_limiters
+from backend.services.metrics import REGISTRY
+
+# Rejections of a single message; aiosmtplib resets the envelope, so the connection stays usable
+SMTP_MESSAGE_ERRORS = (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPSenderRefused, aiosmtplib.SMTPDataError)
+
+# Reusable authenticated aiosmtplib connections; concurrency is bounded by the email semaphore
+class AsyncSMTPConnectionPool:
+    def __init__(self, server, port, email, password, max_messages=100, max_idle=60, timeout=30):
+        self.server = server
+        self.port = port
+        self.email = email
+        self.password = password
+        self.max_messages = max_messages
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.idle = []
+
+    async def _connect(self):
+        server = aiosmtplib.SMTP(hostname=self.server, port=self.port, timeout=self.timeout, start_tls=True)
+        await server.connect()
+        await server.login(self.email, self.password)
+        return {'server': server, 'messages': 0, 'last_used': time.monotonic()}
+
+    async def _close(self, connection):
+        try:
+            await connection['server'].quit()
+        except Exception:
+            try:
+                connection['server'].close()
+            except Exception:
+                pass
+
+    async def _is_usable(self, connection):
+        if connection['messages'] >= self.max_messages:
+            return False
+        if time.monotonic() - connection['last_used'] > self.max_idle:
+            return False
+        try:
+            return (await connection['server'].noop()).code == 250
+        except Exception:
+            return False
+
+    async def _acquire(self):
+        while self.idle:
+            connection = self.idle.pop()
+            if await self._is_usable(connection):
+                return connection
+            await self._close(connection)
+        return await self._connect()
+
+    def _release(self, connection):
+        connection['last_used'] = time.monotonic()
+        self.idle.append(connection)
+
+    async def send_message(self, msg):
+        connection = await self._acquire()
+        try:
+            await connection['server'].send_message(msg)
+        except (aiosmtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+            # Connection went bad between the check and the send; retry once on a fresh one
+            await self._close(connection)
+            connection = await self._connect()
+            try:
+                await connection['server'].send_message(msg)
+            except SMTP_MESSAGE_ERRORS:
+                self._release(connection)
+                raise
+            except Exception:
+                await self._close(connection)
+                raise
+        except SMTP_MESSAGE_ERRORS:
+            self._release(connection)
+            raise
+        except Exception:
+            await self._close(connection)
+            raise
+        connection['messages'] += 1
+        self._release(connection)
+
+    async def close_all(self):
+        while self.idle:
+            await self._close(self.idle.pop())
+
+class AsyncNotificationService:
+    # Same queue/drain interface as NotificationService, on the scanner's event loop
+    def __init__(self, workers=1):
+        self.email_sender = os.getenv('SMTP_EMAIL')
+        self.email_password = os.getenv('SMTP_PASSWORD')
+        self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
+        self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
+
+        self.twilio_sid = os.getenv('TWILIO_ACCOUNT_SID')
+        self.twilio_token = os.getenv('TWILIO_AUTH_TOKEN')
+        self.twilio_phone = os.getenv('TWILIO_PHONE_NUMBER')
+        self.sms_base_url = os.getenv('SMS_API_BASE_URL', 'https://api.twilio.com').rstrip('/')
+        self.sms_url = f"{self.sms_base_url}/2010-04-01/Accounts/{self.twilio_sid}/Messages.json"
+        self.sms_connect_timeout = float(os.getenv('SMS_CONNECT_TIMEOUT', '5'))
+        self.sms_read_timeout = float(os.getenv('SMS_READ_TIMEOUT', '15'))
+        self.sms_pool_size = int(os.getenv('SMS_HTTP_POOL_SIZE', os.getenv('SMS_DISPATCH_WORKERS', '8')))
+
+        # In-flight sends per channel, the asyncio counterpart of the worker pools
+        self.concurrency = {
+            'email': int(os.getenv('EMAIL_DISPATCH_WORKERS', '8')),
+            'sms': int(os.getenv('SMS_DISPATCH_WORKERS', '8'))
+        }
+        self.queue_limit = int(os.getenv('DISPATCH_QUEUE_LIMIT', '1000'))
+        self.rate_limiters = channel_rate_limiters(workers)
+        self.smtp_pool = AsyncSMTPConnectionPool(
+            self.smtp_server,
+            self.smtp_port,
+            self.email_sender,
+            self.email_password,
+            max_messages=int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', '100')),
+            max_idle=int(os.getenv('SMTP_MAX_IDLE_SECONDS', '60'))
+        )
+        self.queue_depth = {'email': 0, 'sms': 0}
+        self.producer_wait_seconds = {'email': 0.0, 'sms': 0.0}
+
+        self.metrics = REGISTRY
+        self.sends = self.metrics.counter(
+            'alertme_notifications_total', 'Notifications sent or failed per channel')
+        self.send_latency = self.metrics.histogram(
+            'alertme_notification_send_seconds', 'Per-send latency against the provider')
+        self.rate_limit_wait = self.metrics.histogram(
+            'alertme_notification_rate_limit_wait_seconds', 'Time a send waited for a rate limit token')
+
+        # Loop-bound objects, created by start() on the scanner's event loop
+        self.slots = None
+        self.http_session = None
+        self.pending = set()
+        self.reset_dispatch_results()
+
+    def start(self):
+        if self.slots is None:
+            self.slots = {channel: asyncio.Semaphore(limit) for channel, limit in self.concurrency.items()}
+        if self.http_session is None:
+            self.http_session = aiohttp.ClientSession(
+                auth=aiohttp.BasicAuth(self.twilio_sid or '', self.twilio_token or ''),
+                connector=aiohttp.TCPConnector(limit=self.sms_pool_size),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.sms_connect_timeout, sock_read=self.sms_read_timeout)
+            )
+
+    def reset_dispatch_results(self):
+        self.dispatch_results = {
+            'email': {'sent': 0, 'failed': 0},
+            'sms': {'sent': 0, 'failed': 0}
+        }
+
+    def queue_email_notification(self, recipient, subject, message, on_result=None):
+        return self._dispatch('email', on_result, self.send_email_notification, recipient, subject, message)
+
+    def queue_sms_notification(self, phone_number, message, on_result=None):
+        return self._dispatch('sms', on_result, self.send_sms_notification, phone_number, message)
+
+    def dispatch_stats(self):
+        return {
+            channel: {
+                'queue_depth': self.queue_depth[channel],
+                'producer_wait_seconds': round(self.producer_wait_seconds[channel], 3),
+                'rate_limit_wait_seconds': round(self.rate_limiters[channel].wait_seconds, 3)
+            }
+            for channel in ('email', 'sms')
+        }
+
+    def _dispatch(self, channel, on_result, send, *args):
+        # Called from scanner code running on the loop; the send runs as a task
+        self.queue_depth[channel] += 1
+        task = asyncio.get_running_loop().create_task(self._run_send(channel, on_result, send, args))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+        return task
+
+    async def throttle(self):
+        # Backpressure: producers wait while DISPATCH_QUEUE_LIMIT sends are queued or in flight on a channel
+        for channel in ('email', 'sms'):
+            started = time.monotonic()
+            while self.pending and self.queue_depth[channel] >= self.queue_limit:
+                await asyncio.wait(self.pending, return_when=asyncio.FIRST_COMPLETED)
+            self.producer_wait_seconds[channel] += time.monotonic() - started
+
+    async def _run_send(self, channel, on_result, send, args):
+        try:
+            async with self.slots[channel]:
+                self.rate_limit_wait.observe(await self.rate_limiters[channel].acquire_async(), {'channel': channel})
+                started = time.perf_counter()
+                try:
+                    success = bool(await send(*args))
+                finally:
+                    self.send_latency.observe(time.perf_counter() - started, {'channel': channel})
+        except Exception as e:
+            logging.error(f"{channel} dispatch error: {str(e)}")
+            success = False
+        finally:
+            self.queue_depth[channel] -= 1
+        self.sends.inc(labels={'channel': channel, 'outcome': 'sent' if success else 'failed'})
+        self.dispatch_results[channel]['sent' if success else 'failed'] += 1
+        if on_result:
+            try:
+                # The scanner's callback hands blocking work to an executor and returns it
+                result = on_result(success)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logging.error(f"{channel} result callback error: {str(e)}")
+        return success
+
+    async def drain(self):
+        # Wait for every queued send, including ones queued while waiting
+        while self.pending:
+            await asyncio.gather(*list(self.pending))
+        return {channel: dict(counts) for channel, counts in self.dispatch_results.items()}
+
+    async def close(self):
+        await self.drain()
+        await self.smtp_pool.close_all()
+        if self.http_session is not None:
+            await self.http_session.close()
+            self.http_session = None
+
+    async def send_email_notification(self, recipient, subject, message):
+        try:
+            msg = MIMEMultipart()
+            msg['From'] = self.email_sender
+            msg['To'] = recipient
+            msg['Subject'] = subject
+            msg.attach(MIMEText(message, 'plain'))
+
+            await self.smtp_pool.send_message(msg)
+
+            logging.debug("Email sent successfully to %s", recipient)
+            return True
+        except Exception as e:
+            logging.error(f"Email notification error: {str(e)}")
+            return False
+
+    async def send_sms_notification(self, phone_number, message):
+        try:
+            data = {
+                'To': phone_number,
+                'From': self.twilio_phone,
+                'Body': message
+            }
+            async with self.http_session.post(self.sms_url, data=data) as response:
+                if response.status == 201:
+                    logging.debug("SMS sent successfully to %s", phone_number)
+                    return True
+                logging.error(f"SMS failed with status code: {response.status}")
+                return False
+        except Exception as e:
+            logging.error(f"SMS notification error: {str(e)}")
+            return False
+
+class AsyncDeadlineScanner(DeadlineScanner):
+    # Reads the outbox, deadlines, subscriptions and users through motor and overlaps them with
+    # dispatch: each batch of due deadlines is resolved and sent while the next one is read
+    def __init__(self, partition=None, digest=None):
+        super().__init__(partition=partition, digest=digest)
+        # Retries run on their own thread and keep the thread-based service
+        self.retry_notifications = self.notification_service
+        self.notification_service = AsyncNotificationService(workers=partition[1] if partition else 1)
+        # Deadline batches processed at the same time
+        self.scan_concurrency = int(os.getenv('ASYNC_SCAN_CONCURRENCY', '4'))
+        # Same cluster as the ledger, checkpoint and retry writes made through db_connector
+        self.mongo_uri = MONGODB_URI
+        self.loop = asyncio.new_event_loop()
+        self.async_client = None
+        logging.info("Deadline Scanner using the asyncio engine")
+
+    def scan_deadlines(self, fire_at=None, time_str=None):
+        return self.loop.run_until_complete(self.scan_deadlines_async(fire_at, time_str))
+
+    def shutdown(self):
+        self.retry_queue.stop()
+        self.loop.run_until_complete(self.notification_service.close())
+        self.retry_notifications.shutdown()
+        if self.async_client is not None:
+            self.async_client.close()
+        self.loop.close()
+        logging.info("Deadline Scanner shut down")
+
+    def _connect(self):
+        # Motor clients are bound to the loop they are created on
+        if self.async_client is None:
+            self.async_client = AsyncIOMotorClient(self.mongo_uri, io_loop=self.loop)
+            self.async_db = self.async_client[db.name]
+            self.async_personal_db = self.async_client[self.personal_db.name]
+        self.notification_service.start()
+
+    async def scan_deadlines_async(self, fire_at=None, time_str=None):
+        tasks = []
+        try:
+            current_time = datetime.now()
+            time_str = time_str or current_time.strftime("%I:%M %p")
+            logging.info(f"Starting deadline scan at {time_str}")
+            today = current_time.date()
+            self.scan_reminders = []
+            self.scan_users = {}
+            self.scan_counts = self._new_scan_counts()
+            # Counts left behind by a scan that failed midway
+            self.notification_service.reset_dispatch_results()
+            self._connect()
+            scan_started = time.perf_counter()
+            self.checkpoint.begin(fire_at, self.partition[0] if self.partition else None)
+            # Serializes checkpoint writes so they reach Mongo in _id order
+            self.checkpoint_lock = asyncio.Lock()
+
+            # recipient id -> pending digest, shared by all batches in digest mode
+            digests = {}
+            counts = {'deadlines': 0, 'skipped': 0}
+            slots = asyncio.Semaphore(self.scan_concurrency)
+            # kind -> batches finished out of order, waiting for the checkpoint to reach them
+            self.batch_progress = {}
+            for kind, collection in (('personal', self.async_personal_db.deadlines),
+                                     ('government', self.async_db.government_deadlines)):
+                self.batch_progress[kind] = {'next': 0, 'done': {}}
+                resume_after = await self.loop.run_in_executor(None, self.checkpoint.resume_after, kind)
+                sequence = 0
+                async for batch in self._due_deadline_batches(collection, kind, current_time, resume_after):
+                    await slots.acquire()
+                    task = self.loop.create_task(self._process_batch(kind, sequence, batch, today, digests, counts))
+                    task.add_done_callback(lambda _: slots.release())
+                    tasks.append(task)
+                    sequence += 1
+            await asyncio.gather(*tasks)
+
+            self._log_match_summary()
+            # Digests need every batch before anything is sent
+            self._send_digests(digests)
+            phase_started = self._end_phase('pipeline', scan_started)
+            logging.info(f"Dispatched {len(self.scan_reminders)} reminders, skipped {counts['skipped']} already delivered sends")
+
+            results = await self.notification_service.drain()
+            await self.loop.run_in_executor(None, self.delivery_ledger.flush)
+            await self.loop.run_in_executor(None, self.checkpoint.finish)
+            self._end_phase('drain', phase_started)
+            return self._complete_scan(time_str, counts['deadlines'], results, scan_started)
+
+        except Exception as e:
+            logging.error(f"Error in deadline scan: {str(e)}")
+            # Nothing from a failed scan may keep running into the next one on this loop
+            pending = getattr(self.notification_service, 'pending', ())
+            leftovers = [task for task in tasks + list(pending) if not task.done()]
+            for task in leftovers:
+                task.cancel()
+            await asyncio.gather(*leftovers, return_exceptions=True)
+            return None
+
+    async def _due_deadline_batches(self, collection, kind, now, after_id=None):
+        # Streams the outbox cursor in deadline_id order and yields deadlines, also in _id
+        # order, as soon as a lookup batch fills up
+        deadline_ids = []
+        last_id = None
+        cursor = self.async_db.reminder_outbox.find(
+            *self.reminder_outbox.due_query(now, kind, after_id, self._outbox_buckets(kind))
+        )
+        async for row in cursor.sort('deadline_id', 1):
+            deadline_id = row['deadline_id']
+            if deadline_id == last_id or not ObjectId.is_valid(deadline_id):
+                continue
+            last_id = deadline_id
+            deadline_ids.append(ObjectId(deadline_id))
+            if len(deadline_ids) >= DEADLINE_LOOKUP_BATCH_SIZE:
+                batch = await collection.find({'_id': {'$in': deadline_ids}}).sort('_id', 1).to_list(None)
+                if batch:
+                    yield batch
+                deadline_ids = []
+        if deadline_ids:
+            batch = await collection.find({'_id': {'$in': deadline_ids}}).sort('_id', 1).to_list(None)
+            if batch:
+                yield batch
+
+    async def _process_batch(self, kind, sequence, deadlines, today, digests, counts):
+        self.deadlines_examined.inc(len(deadlines), {'kind': kind})
+        last_id, batch_size = deadlines[-1]['_id'], len(deadlines)
+        if kind == 'personal':
+            personal_deadlines, govt_deadlines = self._filter_partition(deadlines, [])
+            await self._resolve_users_async(personal_deadlines, govt_deadlines)
+        else:
+            await self._attach_subscribers(deadlines)
+            # Subscribers are partitioned by user _id, so they are resolved before filtering
+            await self._resolve_users_async([], deadlines)
+            personal_deadlines, govt_deadlines = self._filter_partition([], deadlines)
+        counts['deadlines'] += len(personal_deadlines) + len(govt_deadlines)
+
+        # Matching has no awaits, so this batch's reminders are the tail of scan_reminders
+        first = len(self.scan_reminders)
+        for deadline in personal_deadlines:
+            self._process_personal_deadline(deadline, today)
+        for deadline in govt_deadlines:
+            self._process_govt_deadline(deadline, today)
+        reminders = self.scan_reminders[first:]
+        for reminder in reminders:
+            self.reminders_matched.inc(labels={'days_until': reminder['days_until']})
+
+        sends = []
+        for start in range(0, len(reminders), REMINDER_BATCH_SIZE):
+            batch = reminders[start:start + REMINDER_BATCH_SIZE]
+            entries = await self.async_db.notification_deliveries.find(
+                *self.delivery_ledger.delivered_query(batch)
+            ).to_list(None)
+            # _dispatch_batch has no awaits, so the new pending sends all belong to this batch
+            queued = set(self.notification_service.pending)
+            counts['skipped'] += self._dispatch_batch(batch, self.delivery_ledger.keys_of(entries), digests)
+            sends.extend(self.notification_service.pending - queued)
+            await self.notification_service.throttle()
+
+        if not self.digest:
+            # The checkpoint may pass this batch only once its sends and ledger entries are durable
+            await asyncio.gather(*sends)
+            await self.loop.run_in_executor(None, self.delivery_ledger.flush)
+            await self._complete_batch(kind, sequence, last_id, batch_size)
+
+    async def _complete_batch(self, kind, sequence, last_id, batch_size):
+        # Batches finish out of order; the checkpoint only advances over a contiguous prefix
+        progress = self.batch_progress[kind]
+        progress['done'][sequence] = (last_id, batch_size)
+        advances = []
+        while progress['next'] in progress['done']:
+            advances.append(progress['done'].pop(progress['next']))
+            progress['next'] += 1
+        if advances:
+            # No await between collecting and queueing on the lock, so writes keep their order
+            async with self.checkpoint_lock:
+                await self.loop.run_in_executor(None, self._advance_checkpoint, kind, advances)
+
+    def _advance_checkpoint(self, kind, advances):
+        for last_id, batch_size in advances:
+            self.checkpoint.advance(kind, last_id, batch_size)
+
+    def _enqueue_retry(self, channel, recipient, message, subject, deliveries):
+        # Runs off the loop; the send task awaits it, so a batch completes only once its
+        # retries are stored
+        return self.loop.run_in_executor(None, functools.partial(
+            self.retry_queue.enqueue, channel, recipient, message, subject=subject, deliveries=deliveries
+        ))
+
+    async def _attach_subscribers(self, deadlines):
+        deadline_ids = [str(deadline['_id']) for deadline in deadlines]
+        by_deadline = {deadline_id: [] for deadline_id in deadline_ids}
+        for start in range(0, len(deadline_ids), LOOKUP_BATCH_SIZE):
+            batch = deadline_ids[start:start + LOOKUP_BATCH_SIZE]
+            cursor = self.async_db.government_subscriptions.find(
+                *GovernmentSubscriptionModel.subscribers_query(batch, self.buckets)
+            )
+            async for subscription in cursor:
+                by_deadline[subscription['deadline_id']].append(subscription['user'])
+        GovernmentSubscriptionModel.merge_subscribers(deadlines, by_deadline)
+
+    async def _resolve_users_async(self, personal_deadlines, govt_deadlines):
+        # Resolved users are cached in scan_users for the rest of the scan
+        emails, user_ids = self._recipient_keys(personal_deadlines, govt_deadlines)
+        emails = [email for email in emails if email not in self.scan_users]
+        user_ids = [user_id for user_id in user_ids if user_id not in self.scan_users]
+        self.users_requested.inc(len(emails) + len(user_ids))
+        for start in range(0, len(emails), USER_LOOKUP_BATCH_SIZE):
+            batch = emails[start:start + USER_LOOKUP_BATCH_SIZE]
+            self.user_lookups.inc()
+            async for user in self.async_db.users.find({'email': {'$in': batch}}, USER_PROJECTION):
+                self._index_user(self.scan_users, user)
+
+        # Owners whose email was already matched above need no second lookup
+        user_ids = [user_id for user_id in user_ids if user_id not in self.scan_users]
+        for start in range(0, len(user_ids), USER_LOOKUP_BATCH_SIZE):
+            batch = user_ids[start:start + USER_LOOKUP_BATCH_SIZE]
+            self.user_lookups.inc()
+            async for user in self.async_db.users.find(self._user_id_query(batch), USER_PROJECTION):
+                self._index_user(self.scan_users, user)
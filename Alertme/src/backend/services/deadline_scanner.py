@@ -1,10 +1,15 @@
 from datetime import datetime, timedelta
-import schedule
-import time
+import argparse
+import json
 import logging
+import multiprocessing
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from pymongo import MongoClient  # Add this import
+from bson import ObjectId
 
 # Add project root to Python path
 current_dir = Path(__file__).resolve().parent
@@ -12,116 +17,569 @@ project_root = current_dir.parent.parent.parent
 src_path = project_root / 'src'
 sys.path.extend([str(project_root), str(src_path)])
 
-from backend.database.db_connector import db
+from backend.database.db_connector import db, MONGODB_URI
+from backend.models.subscription import GovernmentSubscriptionModel
 from backend.services.notification_service import NotificationService
+from backend.services.delivery_ledger import DeliveryLedger
+from backend.services.reminder_outbox import ReminderOutbox, REMINDER_DAYS
+from backend.services.scan_scheduler import ScanScheduler
+from backend.services.retry_queue import NotificationRetryQueue
+from backend.services.scan_checkpoint import ScanCheckpoint
+from backend.services.metrics import REGISTRY
+from backend.utils.date_utils import to_due_at, due_at_filter
+from backend.utils.log_utils import configure_queue_logging
+from backend.utils.partitioning import partition_of, owned_buckets
+
+# Log records go through a queue; file I/O happens on a listener thread, off the send path
+configure_queue_logging('deadline_scanner.log')
+
+# User lookups are batched into $in queries of this size
+USER_LOOKUP_BATCH_SIZE = 1000
+USER_PROJECTION = {'name': 1, 'email': 1, 'phone': 1}
+DEADLINE_LOOKUP_BATCH_SIZE = 1000
+
+# Daily scan windows as (hour, minute, label)
+SCAN_TIMES = [
+    (12, 0, "12:00 PM"),
+    (14, 0, "2:00 PM"),
+    (18, 0, "6:00 PM"),
+    (21, 40, "9:40 PM")
+]
 
-# Configure logging
-logging.basicConfig(
-    filename='deadline_scanner.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Reminders are checked against the delivery ledger in batches of this size
+REMINDER_BATCH_SIZE = 500
+
+# Deadlines listed individually in a digest SMS
+DIGEST_SMS_MAX_ITEMS = 5
+
+# Unresolved subscribers named in the per-scan summary
+LOG_SAMPLE_SIZE = 5
 
 class DeadlineScanner:
-    def __init__(self):
-        self.notification_service = NotificationService()
-        self.personal_db = MongoClient('mongodb://your_mongodb_uri')['your_database_name']
+    def __init__(self, partition=None, digest=None):
+        # partition: (index, count) to only handle recipients hashed to this worker
+        self.partition = partition
+        # Stored recipient buckets this worker owns; its outbox and subscriber queries select only these
+        self.buckets = owned_buckets(*partition) if partition else None
+        # Digest mode sends one email and one SMS per recipient per scan
+        if digest is None:
+            digest = os.getenv('REMINDER_DIGEST', 'false').lower() == 'true'
+        self.digest = digest
+        # Sharded workers split the configured send rates between them
+        self.notification_service = NotificationService(workers=partition[1] if partition else 1)
+        self.personal_db = MongoClient(MONGODB_URI)['your_database_name']
+        self.delivery_ledger = DeliveryLedger(db.notification_deliveries)
+        self.reminder_outbox = ReminderOutbox(db.reminder_outbox)
+        self.subscriptions = GovernmentSubscriptionModel(db)
+        # Resume point of a scheduled scan, saved every SCAN_CHECKPOINT_INTERVAL deadlines
+        self.checkpoint = ScanCheckpoint(
+            db.scanner_checkpoints, int(os.getenv('SCAN_CHECKPOINT_INTERVAL', '1000'))
+        )
+        self.retry_queue = NotificationRetryQueue(
+            db.notification_retries, self.notification_service, self.delivery_ledger
+        )
+        # Users resolved for the current scan, keyed by email and by str(_id)
+        self.scan_users = {}
+        # Reminders matched in the current scan, dispatched in ledger-checked batches
+        self.scan_reminders = []
+        # Per-scan tallies logged as one summary instead of a line per deadline
+        self.scan_counts = self._new_scan_counts()
+
+        self.metrics = REGISTRY
+        self.metrics_file = os.getenv('METRICS_FILE')
+        self.deadlines_examined = self.metrics.counter(
+            'alertme_scan_deadlines_examined_total', 'Deadlines examined by the scanner')
+        self.reminders_matched = self.metrics.counter(
+            'alertme_scan_reminders_matched_total', 'Reminders matched per days-until threshold')
+        self.user_lookups = self.metrics.counter(
+            'alertme_scan_user_lookup_queries_total', 'Batched user lookup queries')
+        self.users_requested = self.metrics.counter(
+            'alertme_scan_users_requested_total', 'Owners and subscribers resolved by the scanner')
+        self.scan_duration = self.metrics.histogram(
+            'alertme_scan_duration_seconds', 'Total scan duration')
+        self.phase_duration = self.metrics.histogram(
+            'alertme_scan_phase_seconds', 'Time spent per scan phase')
         logging.info("Deadline Scanner initialized with personal deadlines database")
     
-    def scan_deadlines(self):
+    def scan_deadlines(self, fire_at=None, time_str=None):
         try:
+            # Scans always run as of now; fire_at only identifies the scheduled window
             current_time = datetime.now()
-            scheduled_times = [
-                (12, 0, "12:00 PM"),
-                (14, 0, "2:00 PM"),
-                (18, 0, "6:00 PM"),
-                (21, 40, "9:40 PM")
-            ]
+            time_str = time_str or current_time.strftime("%I:%M %p")
+            logging.info(f"Starting deadline scan at {time_str}")
+            today = current_time.date()
+            self.scan_reminders = []
+            self.scan_counts = self._new_scan_counts()
+            # Counts left behind by a scan that failed midway
+            self.notification_service.reset_dispatch_results()
+            scan_started = phase_started = time.perf_counter()
+            # A scheduled window that was interrupted resumes after its last checkpoint
+            self.checkpoint.begin(fire_at, self.partition[0] if self.partition else None)
             
-            for hour, minute, time_str in scheduled_times:
-                if current_time.hour == hour and current_time.minute == minute:
-                    logging.info(f"Starting deadline scan at {time_str}")
-                    today = current_time.date()
-                    
-                    # Get deadlines from personal_deadlines_db and government deadlines
-                    personal_deadlines = self.personal_db.deadlines.find({})
-                    govt_deadlines = db.government_deadlines.find({})
-                    
-                    # Process personal deadlines
-                    for deadline in personal_deadlines:
-                        self._process_personal_deadline(deadline, today)
-                    
-                    # Process government deadlines
-                    for deadline in govt_deadlines:
-                        self._process_govt_deadline(deadline, today)
-                        
-                    logging.info(f"Scan completed at {time_str}")
-                    break
+            # Only fetch deadlines with reminder rows due now (range query on notify_at)
+            personal_deadlines = self._fetch_due_deadlines(
+                self.personal_db.deadlines, 'personal', current_time, self.checkpoint.resume_after('personal'))
+            govt_deadlines = self._fetch_due_deadlines(
+                db.government_deadlines, 'government', current_time, self.checkpoint.resume_after('government'))
+            self.subscriptions.attach_subscribers(govt_deadlines, self.buckets)
+            self.deadlines_examined.inc(len(personal_deadlines), {'kind': 'personal'})
+            self.deadlines_examined.inc(len(govt_deadlines), {'kind': 'government'})
+            phase_started = self._end_phase('fetch', phase_started)
+            
+            # Resolve every owner and subscriber up front in a few batched queries
+            self.scan_users = self._resolve_users(personal_deadlines, govt_deadlines)
+            personal_deadlines, govt_deadlines = self._filter_partition(personal_deadlines, govt_deadlines)
+            phase_started = self._end_phase('resolve', phase_started)
+            
+            # Deadlines are matched in _id order, in checkpoint-sized chunks;
+            # each chunk records where its reminders end in scan_reminders
+            chunks = []
+            for kind, deadlines in (('personal', personal_deadlines), ('government', govt_deadlines)):
+                process = self._process_personal_deadline if kind == 'personal' else self._process_govt_deadline
+                for start in range(0, len(deadlines), self.checkpoint.interval):
+                    chunk = deadlines[start:start + self.checkpoint.interval]
+                    for deadline in chunk:
+                        process(deadline, today)
+                    chunks.append((kind, chunk[-1]['_id'], len(chunk), len(self.scan_reminders)))
+            for reminder in self.scan_reminders:
+                self.reminders_matched.inc(labels={'days_until': reminder['days_until']})
+            self._log_match_summary()
+            phase_started = self._end_phase('match', phase_started)
+            
+            if self.digest:
+                # Digests span every chunk, so the window is only complete at the end
+                self._dispatch_reminders(self.scan_reminders)
+            else:
+                first = 0
+                for kind, last_id, count, end in chunks:
+                    self._dispatch_reminders(self.scan_reminders[first:end])
+                    # The checkpoint moves only once the chunk's sends and ledger entries are durable
+                    self.notification_service.drain()
+                    self.delivery_ledger.flush()
+                    self.checkpoint.advance(kind, last_id, count)
+                    first = end
+            phase_started = self._end_phase('dispatch', phase_started)
+                
+            # Wait for the dispatch pipeline to finish every queued send
+            results = self.notification_service.drain()
+            self.delivery_ledger.flush()
+            self.checkpoint.finish()
+            self._end_phase('drain', phase_started)
+            return self._complete_scan(time_str, len(personal_deadlines) + len(govt_deadlines), results, scan_started)
             
         except Exception as e:
             logging.error(f"Error in deadline scan: {str(e)}")
+            return None
+
+    def _complete_scan(self, time_str, deadline_count, results, scan_started):
+        self.scan_duration.observe(time.perf_counter() - scan_started)
+        summary = {
+            'partition': self.partition[0] if self.partition else None,
+            'deadlines': deadline_count,
+            'reminders': len(self.scan_reminders),
+            'email': results['email'],
+            'sms': results['sms']
+        }
+        self.scan_users = {}
+        self.scan_reminders = []
+        logging.info(
+            f"Scan completed at {time_str} - "
+            f"emails sent: {results['email']['sent']}, failed: {results['email']['failed']}; "
+            f"SMS sent: {results['sms']['sent']}, failed: {results['sms']['failed']}"
+        )
+        logging.info(f"Dispatch stats: {self.notification_service.dispatch_stats()}")
+        self.notification_service.reset_dispatch_results()
+        if self.metrics_file:
+            self.metrics.write_to_file(self.metrics_file)
+        return summary
+
+    def _new_scan_counts(self):
+        return {'government_due': 0, 'no_subscribers': 0, 'unknown_subscribers': 0, 'unknown_sample': []}
+
+    def _log_match_summary(self):
+        counts = self.scan_counts
+        personal = sum(1 for reminder in self.scan_reminders if reminder['is_personal'])
+        logging.info(
+            f"Matched {len(self.scan_reminders)} reminders ({personal} personal, "
+            f"{len(self.scan_reminders) - personal} government); {counts['government_due']} government "
+            f"deadlines due for a reminder, {counts['no_subscribers']} without subscribers"
+        )
+        if counts['unknown_subscribers']:
+            logging.error(
+                f"Could not find users for {counts['unknown_subscribers']} subscribers, "
+                f"e.g. {', '.join(counts['unknown_sample'])}"
+            )
+
+    def _filter_partition(self, personal_deadlines, govt_deadlines):
+        # The queries already select this partition's buckets; this drops what they cannot,
+        # rows written before buckets were stored and embedded subscriber arrays. Recipients
+        # are keyed by user _id (see partition_keys), so subscribers must be resolved first.
+        if self.partition:
+            personal_deadlines = [d for d in personal_deadlines if self._owns(d.get('user_id'))]
+            for deadline in govt_deadlines:
+                deadline['subscribers'] = [
+                    s for s in deadline.get('subscribers', []) if self._owns(self._partition_key(s))
+                ]
+        return personal_deadlines, govt_deadlines
+
+    def _partition_key(self, subscriber):
+        user = self.scan_users.get(str(subscriber))
+        return str(user['_id']) if user else str(subscriber)
+
+    def _end_phase(self, phase, started):
+        now = time.perf_counter()
+        self.phase_duration.observe(now - started, {'phase': phase})
+        return now
+
+    def _owns(self, recipient_key):
+        if not self.partition:
+            return True
+        index, count = self.partition
+        return partition_of(recipient_key, count) == index
+
+    def start_retrier(self):
+        self.retry_queue.start()
+
+    def shutdown(self):
+        self.retry_queue.stop()
+        self.notification_service.shutdown()
+        logging.info("Deadline Scanner shut down")
+
+    def _outbox_buckets(self, kind):
+        # Government rows are shared by all subscribers, so only personal rows are partitioned
+        return self.buckets if kind == 'personal' else None
+
+    def _fetch_due_deadlines(self, collection, kind, now, after_id=None):
+        # Returned in _id order so a checkpoint is a single resume point
+        rows = self.reminder_outbox.due_rows(now, kind, after_id, self._outbox_buckets(kind))
+        deadline_ids = sorted({row['deadline_id'] for row in rows})
+        deadlines = []
+        for start in range(0, len(deadline_ids), DEADLINE_LOOKUP_BATCH_SIZE):
+            batch = [ObjectId(deadline_id) for deadline_id in deadline_ids[start:start + DEADLINE_LOOKUP_BATCH_SIZE]
+                     if ObjectId.is_valid(deadline_id)]
+            deadlines.extend(collection.find({'_id': {'$in': batch}}).sort('_id', 1))
+        return deadlines
+
+    def rebuild_outbox(self):
+        self.reminder_outbox.rebuild(self.personal_db.deadlines, 'personal')
+        self.reminder_outbox.rebuild(db.government_deadlines, 'government')
+
+    def simulate(self, start_date=None, days=90):
+        # Forecast reminder volume without sending: each deadline's reminder dates are
+        # computed once and bucketed by day, instead of re-scanning for every simulated day
+        start_date = start_date or datetime.now().date()
+        end_date = start_date + timedelta(days=days)
+        window_start = datetime(start_date.year, start_date.month, start_date.day)
+        window_end = datetime(end_date.year, end_date.month, end_date.day) + timedelta(days=max(REMINDER_DAYS))
+        # Index range query on the typed due_at field; documents the due_at migration has
+        # not reached yet are matched on the due_date string, as _due_date() reads them
+        due_range = due_at_filter(window_start, window_end)
+        projection = {'due_date': 1, 'due_at': 1, 'user_id': 1, 'subscribers': 1}
+        personal_deadlines = list(self.personal_db.deadlines.find(due_range, projection))
+        govt_deadlines = self.subscriptions.attach_subscribers(list(db.government_deadlines.find(due_range, projection)))
+        users = self._resolve_users(personal_deadlines, govt_deadlines)
+
+        # day -> recipient -> channels with at least one reminder that day
+        per_day = {}
+        reminders_per_day = {}
+        for deadline, recipients in (
+            [(d, [d.get('user_id')]) for d in personal_deadlines] +
+            [(d, d.get('subscribers', [])) for d in govt_deadlines]
+        ):
+            due_date = self._due_date(deadline)
+            if not due_date:
+                continue
+            resolved = [users.get(str(recipient)) for recipient in recipients]
+            resolved = [user for user in resolved if user]
+            if not resolved:
+                continue
+            for days_until in REMINDER_DAYS:
+                reminder_date = due_date - timedelta(days=days_until)
+                if not start_date <= reminder_date < end_date:
+                    continue
+                day = reminder_date.isoformat()
+                reminders_per_day[day] = reminders_per_day.get(day, 0) + len(resolved)
+                recipients_today = per_day.setdefault(day, {})
+                for user in resolved:
+                    channels = recipients_today.setdefault(str(user['_id']), [user, 0, 0])
+                    channels[1] += 1 if user.get('email') else 0
+                    channels[2] += 1 if user.get('phone') else 0
+
+        forecast = {'days': {}, 'recipients': {}, 'totals': {'reminders': 0, 'email': 0, 'sms': 0}}
+        for day in sorted(per_day):
+            day_counts = {'reminders': reminders_per_day[day], 'email': 0, 'sms': 0}
+            for user, emails, sms in per_day[day].values():
+                # Digest mode collapses a recipient's reminders for the day into one message per channel
+                if self.digest:
+                    emails, sms = min(emails, 1), min(sms, 1)
+                day_counts['email'] += emails
+                day_counts['sms'] += sms
+                recipient = forecast['recipients'].setdefault(
+                    user.get('email') or str(user['_id']), {'email': 0, 'sms': 0}
+                )
+                recipient['email'] += emails
+                recipient['sms'] += sms
+            forecast['days'][day] = day_counts
+            for key in forecast['totals']:
+                forecast['totals'][key] += day_counts[key]
+        if forecast['days']:
+            forecast['peak_day'] = max(
+                forecast['days'], key=lambda day: forecast['days'][day]['email'] + forecast['days'][day]['sms']
+            )
+        logging.info(f"Simulated {days} days from {start_date}: {forecast['totals']}")
+        return forecast
+
+    def _recipient_keys(self, personal_deadlines, govt_deadlines):
+        # Owners are user ids; subscribers are either emails or user ids
+        emails = set()
+        user_ids = set()
+        for deadline in personal_deadlines:
+            if deadline.get('user_id'):
+                user_ids.add(str(deadline['user_id']))
+        for deadline in govt_deadlines:
+            for subscriber in deadline.get('subscribers', []):
+                if '@' in str(subscriber):
+                    emails.add(subscriber)
+                else:
+                    user_ids.add(str(subscriber))
+        return emails, user_ids
+
+    def _user_id_query(self, batch):
+        # Ids may be stored as ObjectIds or as their string form
+        lookup_ids = batch + [ObjectId(user_id) for user_id in batch if ObjectId.is_valid(user_id)]
+        return {'_id': {'$in': lookup_ids}}
+
+    def _index_user(self, users, user):
+        users[str(user['_id'])] = user
+        if user.get('email'):
+            users[user['email']] = user
+
+    def _resolve_users(self, personal_deadlines, govt_deadlines):
+        emails, user_ids = self._recipient_keys(personal_deadlines, govt_deadlines)
+        requested = len(emails) + len(user_ids)
+        users = {}
+        emails = list(emails)
+        for start in range(0, len(emails), USER_LOOKUP_BATCH_SIZE):
+            batch = emails[start:start + USER_LOOKUP_BATCH_SIZE]
+            self.user_lookups.inc()
+            for user in db.users.find({'email': {'$in': batch}}, USER_PROJECTION):
+                self._index_user(users, user)
+
+        user_ids = [user_id for user_id in user_ids if user_id not in users]
+        for start in range(0, len(user_ids), USER_LOOKUP_BATCH_SIZE):
+            batch = user_ids[start:start + USER_LOOKUP_BATCH_SIZE]
+            self.user_lookups.inc()
+            for user in db.users.find(self._user_id_query(batch), USER_PROJECTION):
+                self._index_user(users, user)
+
+        self.users_requested.inc(requested)
+        logging.info(f"Resolved {requested} subscribers and owners for scan")
+        return users
+
+    def _due_date(self, deadline):
+        # Prefer the typed due_at; documents not yet migrated fall back to parsing the string
+        due_at = deadline.get('due_at') or to_due_at(deadline.get('due_date'))
+        return due_at.date() if due_at else None
 
     def _process_personal_deadline(self, deadline, today):
         try:
-            due_date = datetime.strptime(deadline['due_date'], "%Y-%m-%d").date()
+            due_date = self._due_date(deadline)
             days_until = (due_date - today).days
             
             # Check for various reminder intervals
-            if days_until in [30, 15, 7, 3, 1, 0]:
+            if days_until in REMINDER_DAYS:
                 # Get complete user info directly from main db using user_id
-                main_user = db.users.find_one({'_id': deadline['user_id']})
+                main_user = self.scan_users.get(str(deadline['user_id']))
                 if main_user:
-                    self._send_notifications(main_user, deadline, days_until, is_personal=True)
+                    self._add_reminder(main_user, deadline, days_until, is_personal=True)
         except Exception as e:
             logging.error(f"Error processing personal deadline: {str(e)}")
 
     def _process_govt_deadline(self, deadline, today):
         try:
-            due_date = datetime.strptime(deadline['due_date'], "%Y-%m-%d").date()
+            due_date = self._due_date(deadline)
             days_until = (due_date - today).days
             
-            if days_until in [30, 15, 7, 3, 1, 0]:
-                logging.info(f"Processing government deadline: {deadline['title']}, due in {days_until} days")
+            if days_until in REMINDER_DAYS:
+                self.scan_counts['government_due'] += 1
                 
                 subscribers = deadline.get('subscribers', [])
                 if not subscribers:
-                    logging.info(f"No subscribers found for government deadline: {deadline['title']}")
+                    self.scan_counts['no_subscribers'] += 1
                     return
                 
-                # First find user by email if subscriber is email
+                # Subscribers are either emails or user ids, both resolved in _resolve_users
                 for subscriber in subscribers:
-                    if '@' in subscriber:
-                        user = db.users.find_one({'email': subscriber})
-                    else:
-                        user = db.users.find_one({'_id': subscriber})
+                    user = self.scan_users.get(str(subscriber))
                         
                     if user:
-                        self._send_notifications(user, deadline, days_until, is_personal=False)
-                        logging.info(f"Notification sent to subscriber {user.get('email')} for deadline: {deadline['title']}")
+                        self._add_reminder(user, deadline, days_until, is_personal=False)
                     else:
-                        logging.error(f"Could not find user for subscriber: {subscriber}")
+                        self.scan_counts['unknown_subscribers'] += 1
+                        if len(self.scan_counts['unknown_sample']) < LOG_SAMPLE_SIZE:
+                            self.scan_counts['unknown_sample'].append(str(subscriber))
                         
         except Exception as e:
             logging.error(f"Error processing government deadline {deadline.get('title', 'Unknown')}: {str(e)}")
 
-    def _send_notifications(self, user, deadline, days_until, is_personal=False):
-        try:
-            # Set urgency level and emoji based on days remaining
-            if days_until == 0:
-                urgency = "🔴"  # Due today
-                urgency_level = "DUE TODAY"
-            elif days_until <= 3:
-                urgency = "🟠"  # Very urgent
-                urgency_level = "VERY URGENT"
-            elif days_until <= 7:
-                urgency = "🟡"  # Urgent
-                urgency_level = "URGENT"
-            elif days_until <= 15:
-                urgency = "🟢"  # Moderate
-                urgency_level = "MODERATE"
+    def _add_reminder(self, user, deadline, days_until, is_personal):
+        self.scan_reminders.append({
+            'user': user,
+            'deadline': deadline,
+            'days_until': days_until,
+            'is_personal': is_personal
+        })
+
+    def _dispatch_reminders(self, reminders):
+        skipped = 0
+        # recipient id -> {'user', 'email': [reminders], 'sms': [reminders]} in digest mode
+        digests = {}
+        for start in range(0, len(reminders), REMINDER_BATCH_SIZE):
+            batch = reminders[start:start + REMINDER_BATCH_SIZE]
+            # One ledger lookup per batch; anything already delivered is skipped
+            skipped += self._dispatch_batch(batch, self.delivery_ledger.delivered_keys(batch), digests)
+            # Persist deliveries that completed so far
+            self.delivery_ledger.flush()
+        self._send_digests(digests)
+        logging.info(f"Dispatched {len(reminders)} reminders, skipped {skipped} already delivered sends")
+
+    def _dispatch_batch(self, batch, delivered, digests):
+        # Queues sends for channels not in the ledger yet; returns how many were skipped
+        skipped = 0
+        for reminder in batch:
+            channels = [
+                channel for channel in ('email', 'sms')
+                if self._delivery_key(reminder, channel) not in delivered
+            ]
+            skipped += 2 - len(channels)
+            if not channels:
+                continue
+            if self.digest:
+                user = reminder['user']
+                digest = digests.setdefault(str(user['_id']), {'user': user, 'email': [], 'sms': []})
+                for channel in channels:
+                    digest[channel].append(reminder)
             else:
-                urgency = "🔵"  # Normal
-                urgency_level = "REMINDER"
+                self._send_notifications(
+                    reminder['user'],
+                    reminder['deadline'],
+                    reminder['days_until'],
+                    is_personal=reminder['is_personal'],
+                    channels=channels
+                )
+        return skipped
+
+    def _send_digests(self, digests):
+        for digest in digests.values():
+            self._send_digest(digest['user'], digest['email'], digest['sms'])
+        if digests:
+            logging.info(f"Grouped reminders into digests for {len(digests)} recipients")
+
+    def _delivery_key(self, reminder, channel):
+        return DeliveryLedger.make_key(
+            reminder['deadline']['_id'],
+            reminder['user']['_id'],
+            reminder['deadline']['due_date'],
+            reminder['days_until'],
+            channel
+        )
+
+    def _on_send_result(self, user, reminders, channel, message, subject=None):
+        # reminders: (deadline, days_until) pairs covered by this send
+        def on_result(success):
+            deliveries = [
+                {
+                    'deadline_id': str(deadline['_id']),
+                    'recipient': str(user['_id']),
+                    'due_date': deadline['due_date'],
+                    'days_until': days_until
+                }
+                for deadline, days_until in reminders
+            ]
+            # Failed sends are still recorded so later scans leave them to the retry queue
+            for delivery in deliveries:
+                self.delivery_ledger.record(
+                    delivery['deadline_id'], delivery['recipient'], delivery['due_date'],
+                    delivery['days_until'], channel, status='delivered' if success else 'retrying'
+                )
+            if not success:
+                recipient = user['email'] if channel == 'email' else user['phone']
+                return self._enqueue_retry(channel, recipient, message, subject, deliveries)
+        return on_result
+
+    def _enqueue_retry(self, channel, recipient, message, subject, deliveries):
+        self.retry_queue.enqueue(channel, recipient, message, subject=subject, deliveries=deliveries)
+
+    def _urgency(self, days_until):
+        # Urgency emoji and level based on days remaining
+        if days_until == 0:
+            return "🔴", "DUE TODAY"
+        elif days_until <= 3:
+            return "🟠", "VERY URGENT"
+        elif days_until <= 7:
+            return "🟡", "URGENT"
+        elif days_until <= 15:
+            return "🟢", "MODERATE"
+        return "🔵", "REMINDER"
+
+    def _send_digest(self, user, email_reminders, sms_reminders):
+        try:
+            # Most urgent first
+            email_reminders = sorted(email_reminders, key=lambda r: r['days_until'])
+            sms_reminders = sorted(sms_reminders, key=lambda r: r['days_until'])
+
+            if user.get('email') and email_reminders:
+                urgency, urgency_level = self._urgency(email_reminders[0]['days_until'])
+                subject = f"{urgency} {urgency_level}: {len(email_reminders)} upcoming deadline(s)"
+                lines = []
+                for reminder in email_reminders:
+                    deadline = reminder['deadline']
+                    item_urgency, item_level = self._urgency(reminder['days_until'])
+                    deadline_type = "Personal" if reminder['is_personal'] else "Government"
+                    lines.append(
+                        f"{item_urgency} {item_level} - {deadline['title']} ({deadline_type})\n"
+                        f"   Due Date: {deadline['due_date']} | Days Remaining: {reminder['days_until']} | "
+                        f"Priority: {deadline.get('priority', 'N/A')}"
+                    )
+                email_message = (
+                    f"Hello {user['name']},\n\n"
+                    f"Here are your upcoming deadlines:\n\n"
+                    + "\n\n".join(lines) +
+                    "\n\nPlease ensure to complete these tasks on time.\n\n"
+                    "Best regards,\nAlertMe System"
+                )
+                self.notification_service.queue_email_notification(
+                    user['email'],
+                    subject,
+                    email_message,
+                    on_result=self._on_send_result(
+                        user, [(r['deadline'], r['days_until']) for r in email_reminders],
+                        'email', email_message, subject
+                    )
+                )
+
+            if user.get('phone') and sms_reminders:
+                items = [
+                    f"{self._urgency(r['days_until'])[0]} {r['deadline']['title']} in {r['days_until']}d"
+                    for r in sms_reminders[:DIGEST_SMS_MAX_ITEMS]
+                ]
+                if len(sms_reminders) > DIGEST_SMS_MAX_ITEMS:
+                    items.append(f"+{len(sms_reminders) - DIGEST_SMS_MAX_ITEMS} more")
+                sms_message = f"AlertMe: {len(sms_reminders)} deadline(s) due soon. " + "; ".join(items)
+                self.notification_service.queue_sms_notification(
+                    user['phone'],
+                    sms_message,
+                    on_result=self._on_send_result(
+                        user, [(r['deadline'], r['days_until']) for r in sms_reminders], 'sms', sms_message
+                    )
+                )
+
+        except Exception as e:
+            logging.error(f"Error sending digest: {str(e)}")
+
+    def _send_notifications(self, user, deadline, days_until, is_personal=False, channels=('email', 'sms')):
+        try:
+            urgency, urgency_level = self._urgency(days_until)
             
             deadline_type = "Personal" if is_personal else "Government"
             
@@ -141,44 +599,143 @@ class DeadlineScanner:
                 f"Best regards,\nAlertMe System"
             )
             
-            # Send notifications
-            if user.get('email'):
-                self.notification_service.send_email_notification(
+            # Hand notifications to the dispatch pipeline
+            if user.get('email') and 'email' in channels:
+                self.notification_service.queue_email_notification(
                     user['email'],
                     subject,
-                    email_message
+                    email_message,
+                    on_result=self._on_send_result(user, [(deadline, days_until)], 'email', email_message, subject)
                 )
-                logging.info(f"Email reminder sent to {user['email']} for {deadline_type} deadline")
                 
-            if user.get('phone'):
+            if user.get('phone') and 'sms' in channels:
                 sms_message = (
                     f"{urgency} {urgency_level}: {deadline['title']} "
                     f"due in {days_until} days. "
                     f"Priority: {deadline.get('priority', 'N/A')}"
                 )
-                self.notification_service.send_sms_notification(
+                self.notification_service.queue_sms_notification(
                     user['phone'],
-                    sms_message
+                    sms_message,
+                    on_result=self._on_send_result(user, [(deadline, days_until)], 'sms', sms_message)
                 )
-                logging.info(f"SMS reminder sent to {user['phone']}")
                 
         except Exception as e:
             logging.error(f"Error sending notifications: {str(e)}")
 
+def create_scanner(partition=None):
+    # SCANNER_ENGINE=async selects the asyncio engine (motor, aiosmtplib, aiohttp)
+    if os.getenv('SCANNER_ENGINE', 'sync').lower() == 'async':
+        from backend.services.async_scanner import AsyncDeadlineScanner
+        return AsyncDeadlineScanner(partition=partition)
+    return DeadlineScanner(partition=partition)
+
+# Scanner owned by a sharded worker process, reused across scans
+worker_scanner = None
+
+def _scan_partition(index, count, fire_at, time_str):
+    global worker_scanner
+    if worker_scanner is None:
+        worker_scanner = create_scanner(partition=(index, count))
+        # Each worker process has its own registry, exported separately
+        if worker_scanner.metrics_file:
+            worker_scanner.metrics_file = f"{worker_scanner.metrics_file}.{index}"
+        if os.getenv('METRICS_PORT'):
+            REGISTRY.start_http_server(int(os.getenv('METRICS_PORT')) + index + 1)
+        worker_scanner.start_retrier()
+    return worker_scanner.scan_deadlines(fire_at, time_str)
+
+def _shutdown_partition():
+    global worker_scanner
+    if worker_scanner is not None:
+        worker_scanner.shutdown()
+        worker_scanner = None
+    return True
+
+class ShardedScanCoordinator:
+    def __init__(self, workers):
+        self.workers = workers
+        # One single-process pool per partition so each worker keeps its own scanner and connections
+        context = multiprocessing.get_context('spawn')
+        self.pools = [ProcessPoolExecutor(max_workers=1, mp_context=context) for _ in range(workers)]
+        logging.info(f"Sharded scanner started with {workers} worker processes")
+
+    def scan_deadlines(self, fire_at=None, time_str=None):
+        futures = [
+            pool.submit(_scan_partition, index, self.workers, fire_at, time_str)
+            for index, pool in enumerate(self.pools)
+        ]
+        totals = {'deadlines': 0, 'reminders': 0, 'email': {'sent': 0, 'failed': 0}, 'sms': {'sent': 0, 'failed': 0}}
+        complete = True
+        for index, future in enumerate(futures):
+            try:
+                summary = future.result()
+            except Exception as e:
+                logging.error(f"Scanner partition {index} failed: {str(e)}")
+                complete = False
+                continue
+            if not summary:
+                logging.error(f"Scanner partition {index} returned no results")
+                complete = False
+                continue
+            logging.info(f"Partition {index}: {summary}")
+            totals['deadlines'] += summary['deadlines']
+            totals['reminders'] += summary['reminders']
+            for channel in ('email', 'sms'):
+                for outcome in ('sent', 'failed'):
+                    totals[channel][outcome] += summary[channel][outcome]
+        logging.info(f"Sharded scan completed: {totals}")
+        # A failed partition makes the whole window a failure, so the scheduler retries it;
+        # partitions that finished skip their delivered reminders through the ledger
+        return totals if complete else None
+
+    def shutdown(self):
+        for pool in self.pools:
+            try:
+                pool.submit(_shutdown_partition).result()
+            except Exception as e:
+                logging.error(f"Error shutting down scanner partition: {str(e)}")
+            pool.shutdown(wait=True)
+
 def run_scanner():
-    scanner = DeadlineScanner()
+    # SCANNER_WORKERS > 1 splits recipients across that many worker processes
+    workers = int(os.getenv('SCANNER_WORKERS', '1'))
+    scanner = ShardedScanCoordinator(workers) if workers > 1 else create_scanner()
+    
+    # Prometheus-format metrics; sharded workers listen on the following ports
+    if os.getenv('METRICS_PORT') and workers <= 1:
+        REGISTRY.start_http_server(int(os.getenv('METRICS_PORT')))
     
-    # Schedule multiple scan times throughout the day
-    schedule.every().day.at("12:00").do(scanner.scan_deadlines)
-    schedule.every().day.at("14:00").do(scanner.scan_deadlines)
-    schedule.every().day.at("18:00").do(scanner.scan_deadlines)
-    schedule.every().day.at("21:40").do(scanner.scan_deadlines)
+    # Sleeps until the next scan window; windows missed during a stall or restart are caught up
+    scheduler = ScanScheduler(scanner.scan_deadlines, SCAN_TIMES, state_collection=db.scanner_state)
     
     logging.info("Deadline scanner started - Scheduled for 12:00 PM, 2:00 PM, 6:00 PM, and 9:40 PM daily")
     
-    while True:
-        schedule.run_pending()
-        time.sleep(30)  # Check every 30 seconds
+    if isinstance(scanner, DeadlineScanner):
+        scanner.start_retrier()
+    
+    try:
+        scheduler.run_forever()
+    finally:
+        scanner.shutdown()
 
 if __name__ == "__main__":
-    run_scanner()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="AlertMe deadline scanner")
+    parser.add_argument('--rebuild-outbox', action='store_true', help="backfill the reminder outbox and exit")
+    parser.add_argument('--simulate', type=int, metavar='DAYS', help="forecast reminders for DAYS days without sending")
+    parser.add_argument('--start', help="first simulated day (YYYY-MM-DD), defaults to today")
+    parser.add_argument('--output', help="write the simulation forecast to this JSON file")
+    args = parser.parse_args()
+
+    if args.rebuild_outbox:
+        DeadlineScanner().rebuild_outbox()
+    elif args.simulate:
+        start = datetime.strptime(args.start, "%Y-%m-%d").date() if args.start else None
+        forecast = DeadlineScanner().simulate(start, args.simulate)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(forecast, f, indent=2)
+        print(json.dumps({'totals': forecast['totals'], 'peak_day': forecast.get('peak_day'),
+                          'days': forecast['days']}, indent=2))
+    else:
+        run_scanner()
\ No newline at end of file
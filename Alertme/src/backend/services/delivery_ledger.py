@@ -0,0 +1,98 @@
+from datetime import datetime
+import logging
+import threading
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+
+# Ledger entries only need to outlive the largest reminder window
+LEDGER_TTL_SECONDS = 40 * 24 * 60 * 60
+
+class DeliveryLedger:
+    def __init__(self, collection):
+        self.collection = collection
+        self.buffer = []
+        self.lock = threading.Lock()
+        # Held across the insert so a flush returns only after earlier entries are written
+        self.flush_lock = threading.Lock()
+
+        # One entry per (deadline, recipient, due date, threshold, channel)
+        self.collection.create_index([
+            ('deadline_id', ASCENDING),
+            ('recipient', ASCENDING),
+            ('due_date', ASCENDING),
+            ('days_until', ASCENDING),
+            ('channel', ASCENDING)
+        ], unique=True)
+        self.collection.create_index([('delivered_at', ASCENDING)], expireAfterSeconds=LEDGER_TTL_SECONDS)
+
+    @staticmethod
+    def make_key(deadline_id, recipient, due_date, days_until, channel):
+        return (str(deadline_id), str(recipient), due_date, days_until, channel)
+
+    def delivered_query(self, reminders):
+        # One query per batch of reminders; exact keys are matched in memory
+        query = {
+            'deadline_id': {'$in': list({str(r['deadline']['_id']) for r in reminders})},
+            'recipient': {'$in': list({str(r['user']['_id']) for r in reminders})},
+            'days_until': {'$in': list({r['days_until'] for r in reminders})}
+        }
+        projection = {'_id': 0, 'deadline_id': 1, 'recipient': 1, 'due_date': 1, 'days_until': 1, 'channel': 1}
+        return query, projection
+
+    def keys_of(self, entries):
+        return {
+            self.make_key(e['deadline_id'], e['recipient'], e['due_date'], e['days_until'], e['channel'])
+            for e in entries
+        }
+
+    def delivered_keys(self, reminders):
+        if not reminders:
+            return set()
+        return self.keys_of(self.collection.find(*self.delivered_query(reminders)))
+
+    def record(self, deadline_id, recipient, due_date, days_until, channel, status='delivered'):
+        # Called from dispatch worker threads; written in bulk by flush()
+        with self.lock:
+            self.buffer.append({
+                'deadline_id': str(deadline_id),
+                'recipient': str(recipient),
+                'due_date': due_date,
+                'days_until': days_until,
+                'channel': channel,
+                'status': status,
+                'delivered_at': datetime.utcnow()
+            })
+
+    def _delivery_filter(self, delivery, channel):
+        return {
+            'deadline_id': str(delivery['deadline_id']),
+            'recipient': str(delivery['recipient']),
+            'due_date': delivery['due_date'],
+            'days_until': delivery['days_until'],
+            'channel': channel
+        }
+
+    def mark_delivered(self, deliveries, channel):
+        for delivery in deliveries:
+            self.collection.update_one(
+                self._delivery_filter(delivery, channel),
+                {'$set': {'status': 'delivered', 'delivered_at': datetime.utcnow()}}
+            )
+
+    def release(self, deliveries, channel):
+        # Lets a later scan attempt the reminder again
+        for delivery in deliveries:
+            self.collection.delete_one(self._delivery_filter(delivery, channel))
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                entries, self.buffer = self.buffer, []
+            if not entries:
+                return 0
+            try:
+                return len(self.collection.insert_many(entries, ordered=False).inserted_ids)
+            except BulkWriteError as e:
+                # Duplicates mean another run already recorded the delivery
+                logging.warning(f"Delivery ledger skipped {len(e.details.get('writeErrors', []))} duplicate entries")
+                return e.details.get('nInserted', 0)
@@ -0,0 +1,120 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import os
+import threading
+
+# Upper bounds in seconds, shared by all histograms
+DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300]
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + list(extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, labels=None):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=None):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets or DEFAULT_BUCKETS
+        # label key -> [bucket counts..., +Inf count, sum]
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, labels=None):
+        key = _label_key(labels)
+        with self.lock:
+            data = self.values.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += 1
+            data[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, data in sorted(self.values.items()):
+                for bound, count in zip(self.buckets, data):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {data[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {data[-2]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {round(data[-1], 6)}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def counter(self, name, help_text):
+        with self.lock:
+            return self.metrics.setdefault(name, Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=None):
+        with self.lock:
+            return self.metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write_to_file(self, path):
+        # Write then rename so scrapers never read a half-written file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def start_http_server(self, port, host='0.0.0.0'):
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ('/', '/metrics'):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-exporter', daemon=True).start()
+        logging.info(f"Metrics exporter listening on port {port}")
+        return server
+
+# Process-wide registry shared by the scanner and the notification service
+REGISTRY = MetricsRegistry()
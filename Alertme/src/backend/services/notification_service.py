@@ -2,14 +2,178 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import requests
+from requests.adapters import HTTPAdapter
 import os
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 import logging
+from .metrics import REGISTRY
 
 load_dotenv()
 
+# Token bucket shared by a channel's workers; rate <= 0 disables limiting
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.wait_seconds = 0.0
+
+    def _take(self, waited):
+        # Takes a token and returns None, or returns how long to wait for the next one
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.wait_seconds += waited
+                return None
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            delay = self._take(waited)
+            if delay is None:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self):
+        # Same as acquire() for the asyncio engine, without blocking the event loop
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            delay = self._take(waited)
+            if delay is None:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+def channel_rate_limiters(workers=1):
+    # Per-channel rate limits (messages per second plus burst size). The provider's limit covers
+    # the whole account, so each of the sharded scanner's worker processes gets an equal share
+    return {
+        'email': TokenBucket(float(os.getenv('EMAIL_RATE_PER_SECOND', '10')) / workers,
+                             int(os.getenv('EMAIL_BURST', '20')) // workers),
+        'sms': TokenBucket(float(os.getenv('SMS_RATE_PER_SECOND', '5')) / workers,
+                           int(os.getenv('SMS_BURST', '10')) // workers)
+    }
+
+# Rejections of a single message; smtplib resets the session, so the connection stays usable
+SMTP_MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+# Reusable authenticated SMTP connections shared by the email workers
+class SMTPConnectionPool:
+    def __init__(self, server, port, email, password, size=4, max_messages=100, max_idle=60, timeout=30):
+        self.server = server
+        self.port = port
+        self.email = email
+        self.password = password
+        self.max_messages = max_messages
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(size)
+        self.idle = queue.LifoQueue()
+
+    def _connect(self):
+        server = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        server.starttls()
+        server.login(self.email, self.password)
+        return {'server': server, 'messages': 0, 'last_used': time.monotonic()}
+
+    def _close(self, connection):
+        try:
+            connection['server'].quit()
+        except Exception:
+            try:
+                connection['server'].close()
+            except Exception:
+                pass
+
+    def _is_usable(self, connection):
+        if connection['messages'] >= self.max_messages:
+            return False
+        if time.monotonic() - connection['last_used'] > self.max_idle:
+            return False
+        try:
+            return connection['server'].noop()[0] == 250
+        except Exception:
+            return False
+
+    def _acquire(self):
+        self.slots.acquire()
+        try:
+            while True:
+                try:
+                    connection = self.idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if self._is_usable(connection):
+                    return connection
+                self._close(connection)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def _release(self, connection):
+        connection['last_used'] = time.monotonic()
+        self.idle.put(connection)
+        self.slots.release()
+
+    def _discard(self, connection):
+        self._close(connection)
+        self.slots.release()
+
+    def send_message(self, msg):
+        connection = self._acquire()
+        try:
+            connection['server'].send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+            # Connection went bad between the check and the send; retry once on a fresh one
+            self._close(connection)
+            try:
+                connection = self._connect()
+            except Exception:
+                self.slots.release()
+                raise
+            try:
+                connection['server'].send_message(msg)
+            except SMTP_MESSAGE_ERRORS:
+                self._release(connection)
+                raise
+            except Exception:
+                self._discard(connection)
+                raise
+        except SMTP_MESSAGE_ERRORS:
+            self._release(connection)
+            raise
+        except Exception:
+            self._discard(connection)
+            raise
+        connection['messages'] += 1
+        self._release(connection)
+
+    def close_all(self):
+        while True:
+            try:
+                connection = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close(connection)
+
 class NotificationService:
-    def __init__(self):
+    def __init__(self, workers=1):
         # Email configuration
         self.email_sender = os.getenv('SMTP_EMAIL')
         self.email_password = os.getenv('SMTP_PASSWORD')
@@ -20,6 +184,158 @@ class NotificationService:
         self.twilio_sid = os.getenv('TWILIO_ACCOUNT_SID')
         self.twilio_token = os.getenv('TWILIO_AUTH_TOKEN')
         self.twilio_phone = os.getenv('TWILIO_PHONE_NUMBER')
+        # Base URL can point at a local stand-in server for load tests
+        self.sms_base_url = os.getenv('SMS_API_BASE_URL', 'https://api.twilio.com').rstrip('/')
+        self.sms_url = f"{self.sms_base_url}/2010-04-01/Accounts/{self.twilio_sid}/Messages.json"
+        self.sms_timeout = (
+            float(os.getenv('SMS_CONNECT_TIMEOUT', '5')),
+            float(os.getenv('SMS_READ_TIMEOUT', '15'))
+        )
+
+        # Dispatch pipeline: each channel has its own bounded worker pool
+        self.email_workers = int(os.getenv('EMAIL_DISPATCH_WORKERS', '8'))
+        self.sms_workers = int(os.getenv('SMS_DISPATCH_WORKERS', '8'))
+        self.executors = {
+            'email': ThreadPoolExecutor(max_workers=self.email_workers, thread_name_prefix='email-dispatch'),
+            'sms': ThreadPoolExecutor(max_workers=self.sms_workers, thread_name_prefix='sms-dispatch')
+        }
+        # Keep-alive HTTP session shared by all SMS sends
+        sms_pool_size = int(os.getenv('SMS_HTTP_POOL_SIZE', str(self.sms_workers)))
+        self.http_session = requests.Session()
+        self.http_session.auth = (self.twilio_sid, self.twilio_token)
+        self.http_session.headers.update({'Connection': 'keep-alive'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=sms_pool_size, pool_block=True)
+        self.http_session.mount('https://', adapter)
+        self.http_session.mount('http://', adapter)
+
+        self.smtp_pool = SMTPConnectionPool(
+            self.smtp_server,
+            self.smtp_port,
+            self.email_sender,
+            self.email_password,
+            size=int(os.getenv('SMTP_POOL_SIZE', str(self.email_workers))),
+            max_messages=int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', '100')),
+            max_idle=int(os.getenv('SMTP_MAX_IDLE_SECONDS', '60'))
+        )
+        self.rate_limiters = channel_rate_limiters(workers)
+        # Backpressure: producers block once this many sends are queued or in flight on a channel
+        queue_limit = int(os.getenv('DISPATCH_QUEUE_LIMIT', '1000'))
+        self.queue_slots = {
+            'email': threading.BoundedSemaphore(queue_limit),
+            'sms': threading.BoundedSemaphore(queue_limit)
+        }
+        self.queue_depth = {'email': 0, 'sms': 0}
+        self.producer_wait_seconds = {'email': 0.0, 'sms': 0.0}
+
+        self.metrics = REGISTRY
+        self.sends = self.metrics.counter(
+            'alertme_notifications_total', 'Notifications sent or failed per channel')
+        self.send_latency = self.metrics.histogram(
+            'alertme_notification_send_seconds', 'Per-send latency against the provider')
+        self.rate_limit_wait = self.metrics.histogram(
+            'alertme_notification_rate_limit_wait_seconds', 'Time a send waited for a rate limit token')
+
+        self.pending = []
+        self.dispatch_lock = threading.Lock()
+        # Sends made for the retry queue; kept out of pending and dispatch_results so they
+        # neither hold up a scan's drain() nor count toward its summary
+        self.retry_results = {'email': {'sent': 0, 'failed': 0}, 'sms': {'sent': 0, 'failed': 0}}
+        self.reset_dispatch_results()
+
+    def reset_dispatch_results(self):
+        with self.dispatch_lock:
+            self.dispatch_results = {
+                'email': {'sent': 0, 'failed': 0},
+                'sms': {'sent': 0, 'failed': 0}
+            }
+
+    def queue_email_notification(self, recipient, subject, message, on_result=None, retry=False):
+        return self._dispatch('email', on_result, retry, self.send_email_notification, recipient, subject, message)
+
+    def queue_sms_notification(self, phone_number, message, on_result=None, retry=False):
+        return self._dispatch('sms', on_result, retry, self.send_sms_notification, phone_number, message)
+
+    def dispatch_stats(self):
+        with self.dispatch_lock:
+            return {
+                channel: {
+                    'queue_depth': self.queue_depth[channel],
+                    'producer_wait_seconds': round(self.producer_wait_seconds[channel], 3),
+                    'rate_limit_wait_seconds': round(self.rate_limiters[channel].wait_seconds, 3)
+                }
+                for channel in ('email', 'sms')
+            }
+
+    def _dispatch(self, channel, on_result, retry, send, *args):
+        # Pause the producer instead of queueing without bound
+        started = time.monotonic()
+        self.queue_slots[channel].acquire()
+        waited = time.monotonic() - started
+        with self.dispatch_lock:
+            self.queue_depth[channel] += 1
+            self.producer_wait_seconds[channel] += waited
+        try:
+            future = self.executors[channel].submit(self._run_send, channel, on_result, retry, send, args)
+        except Exception:
+            self._release_slot(channel)
+            raise
+        if not retry:
+            # The retry queue waits on its own futures
+            with self.dispatch_lock:
+                self.pending.append(future)
+        return future
+
+    def _release_slot(self, channel):
+        with self.dispatch_lock:
+            self.queue_depth[channel] -= 1
+        self.queue_slots[channel].release()
+
+    def _run_send(self, channel, on_result, retry, send, args):
+        # Runs on a worker thread; the result is recorded before the future completes
+        try:
+            self.rate_limit_wait.observe(self.rate_limiters[channel].acquire(), {'channel': channel})
+            started = time.perf_counter()
+            try:
+                success = bool(send(*args))
+            finally:
+                self.send_latency.observe(time.perf_counter() - started, {'channel': channel})
+        except Exception as e:
+            logging.error(f"{channel} dispatch error: {str(e)}")
+            success = False
+        finally:
+            self._release_slot(channel)
+        self.sends.inc(labels={'channel': channel, 'outcome': 'sent' if success else 'failed'})
+        self._record_result(channel, success, retry)
+        if on_result:
+            try:
+                on_result(success)
+            except Exception as e:
+                logging.error(f"{channel} result callback error: {str(e)}")
+        return success
+
+    def _record_result(self, channel, success, retry=False):
+        # Failed sends are re-queued by the on_result callback, so only counts are kept here
+        results = self.retry_results if retry else self.dispatch_results
+        with self.dispatch_lock:
+            results[channel]['sent' if success else 'failed'] += 1
+
+    def drain(self):
+        # Wait for every queued send, including ones queued while waiting
+        while True:
+            with self.dispatch_lock:
+                pending, self.pending = self.pending, []
+            if not pending:
+                break
+            wait(pending)
+        with self.dispatch_lock:
+            return {channel: dict(counts) for channel, counts in self.dispatch_results.items()}
+
+    def shutdown(self):
+        self.drain()
+        for executor in self.executors.values():
+            executor.shutdown(wait=True)
+        self.smtp_pool.close_all()
+        self.http_session.close()
 
     def send_email_notification(self, recipient, subject, message):
         try:
@@ -29,13 +345,10 @@ class NotificationService:
             msg['Subject'] = subject
             msg.attach(MIMEText(message, 'plain'))
             
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.email_sender, self.email_password)
-            server.send_message(msg)
-            server.quit()
+            self.smtp_pool.send_message(msg)
             
-            logging.info(f"Email sent successfully to {recipient}")
+            # Per-send lines only at DEBUG; scans log aggregated counts
+            logging.debug("Email sent successfully to %s", recipient)
             return True
         except Exception as e:
             logging.error(f"Email notification error: {str(e)}")
@@ -43,20 +356,19 @@ class NotificationService:
 
     def send_sms_notification(self, phone_number, message):
         try:
-            url = f"https://api.twilio.com/2010-04-01/Accounts/{self.twilio_sid}/Messages.json"
             data = {
                 'To': phone_number,
                 'From': self.twilio_phone,
                 'Body': message
             }
-            response = requests.post(
-                url,
+            response = self.http_session.post(
+                self.sms_url,
                 data=data,
-                auth=(self.twilio_sid, self.twilio_token)
+                timeout=self.sms_timeout
             )
             
             if response.status_code == 201:
-                logging.info(f"SMS sent successfully to {phone_number}")
+                logging.debug("SMS sent successfully to %s", phone_number)
                 return True
             else:
                 logging.error(f"SMS failed with status code: {response.status_code}")
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+import logging
+from pymongo import ASCENDING
+from ..utils.partitioning import partition_bucket, bucket_filter
+
+# Days before the due date on which reminders are sent
+REMINDER_DAYS = [30, 15, 7, 3, 1, 0]
+
+# Rows are kept for a couple of days after they fire, then expire
+OUTBOX_TTL_SECONDS = 2 * 24 * 60 * 60
+
+class ReminderOutbox:
+    def __init__(self, collection):
+        self.collection = collection
+        self.collection.create_index([('notify_at', ASCENDING), ('kind', ASCENDING), ('bucket', ASCENDING)])
+        self.collection.create_index([('deadline_id', ASCENDING)])
+        self.collection.create_index([('expires_at', ASCENDING)], expireAfterSeconds=0)
+
+    def build_rows(self, deadline_id, kind, due_date, today=None, owner=None):
+        try:
+            due = datetime.strptime(due_date, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            return []
+        today = today or datetime.now().date()
+        rows = []
+        for days in REMINDER_DAYS:
+            notify_at = due - timedelta(days=days)
+            if notify_at.date() < today:
+                continue
+            row = {
+                'deadline_id': str(deadline_id),
+                'kind': kind,
+                'due_date': due_date,
+                'days_until': days,
+                'notify_at': notify_at,
+                'expires_at': notify_at + timedelta(seconds=OUTBOX_TTL_SECONDS)
+            }
+            if owner:
+                # Personal reminders go to one recipient, so scanner workers can select their rows
+                row['bucket'] = partition_bucket(owner)
+            rows.append(row)
+        return rows
+
+    def plan(self, deadline_id, kind, due_date, owner=None):
+        # Replaces any earlier plan, so edits re-plan only this deadline
+        self.cancel(deadline_id)
+        rows = self.build_rows(deadline_id, kind, due_date, owner=owner)
+        if rows:
+            self.collection.insert_many(rows)
+        return len(rows)
+
+    def cancel(self, deadline_id):
+        self.collection.delete_many({'deadline_id': str(deadline_id)})
+
+    def due_query(self, now, kind=None, after_id=None, buckets=None):
+        # Everything scheduled for today up to now; after_id skips deadlines a resumed scan already covered
+        start = datetime(now.year, now.month, now.day)
+        query = {'notify_at': {'$gte': start, '$lte': now}}
+        if kind:
+            query['kind'] = kind
+        if after_id:
+            # Hex ObjectId strings sort in the same order as the ids
+            query['deadline_id'] = {'$gt': str(after_id)}
+        if buckets is not None:
+            query['bucket'] = bucket_filter(buckets)
+        return query, {'_id': 0, 'deadline_id': 1, 'days_until': 1}
+
+    def due_rows(self, now, kind=None, after_id=None, buckets=None):
+        return self.collection.find(*self.due_query(now, kind, after_id, buckets))
+
+    def rebuild(self, deadlines, kind, batch_size=1000):
+        # Backfill for deadlines created before the outbox existed
+        self.collection.delete_many({'kind': kind})
+        batch = []
+        planned = 0
+        for deadline in deadlines.find({}, {'due_date': 1, 'user_id': 1}):
+            owner = deadline.get('user_id') if kind == 'personal' else None
+            batch.extend(self.build_rows(deadline['_id'], kind, deadline.get('due_date'), owner=owner))
+            if len(batch) >= batch_size:
+                self.collection.insert_many(batch)
+                planned += len(batch)
+                batch = []
+        if batch:
+            self.collection.insert_many(batch)
+            planned += len(batch)
+        logging.info(f"Rebuilt {planned} {kind} reminder outbox rows")
+        return planned
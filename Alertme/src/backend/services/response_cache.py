@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from ..utils.revisions import MongoRevisionCounter, SharedRevisionCounter
+
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '60'))
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '256'))
+
+def page_affected(meta, deadline_id=None, due_date=None):
+    # A write touches a cached page if the deadline is on it, or if its due date falls in
+    # the page's due_date range (lo is the cursor's, hi the last row's; None is unbounded)
+    if deadline_id is not None and str(deadline_id) in meta['ids']:
+        return True
+    if due_date is None:
+        return False
+    lo, hi = meta.get('lo'), meta.get('hi')
+    return (lo is None or due_date >= lo) and (hi is None or due_date <= hi)
+
+class CacheBackend:
+    # get/set/invalidate/generation are provided by the backends below
+
+    def invalidate_deadline(self, deadline_id=None, due_date=None):
+        return self.invalidate(lambda meta: page_affected(meta, deadline_id, due_date))
+
+class LocalCacheBackend(CacheBackend):
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        # Serialized bodies of this process only, in LRU order
+        self.max_entries = max(max_entries, 1)
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation_count = 0
+
+    def generation(self):
+        return self.generation_count
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, body, meta, generation):
+        with self.lock:
+            # An invalidation since the caller read generation() may have covered this body
+            if generation != self.generation_count:
+                return
+            self.entries[key] = (time.monotonic() + self.ttl, body, meta)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, predicate):
+        with self.lock:
+            self.generation_count += 1
+            stale = [key for key, entry in self.entries.items() if predicate(entry[2])]
+            for key in stale:
+                del self.entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.generation_count += 1
+            self.entries.clear()
+
+    def revisions(self, collection):
+        # This cache is per process, but list revisions must be shared by every worker
+        return MongoRevisionCounter(collection)
+
+class RedisCacheBackend(CacheBackend):
+    def __init__(self, url, ttl=RESPONSE_CACHE_TTL, prefix='alertme:cache:'):
+        # Shared by every worker. Entries expire after ttl; the size bound is Redis's own
+        # maxmemory with an allkeys-lru policy
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.watch_error = redis.WatchError
+        self.ttl = ttl
+        self.prefix = prefix
+        self.meta_key = prefix + 'meta'
+        self.generation_key = prefix + 'generation'
+
+    def generation(self):
+        return int(self.client.get(self.generation_key) or 0)
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, body, meta, generation):
+        # WATCH makes the generation check and the write one transaction: an invalidation
+        # that lands in between aborts the write instead of letting a stale body in
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(self.generation_key)
+                if int(pipe.get(self.generation_key) or 0) != generation:
+                    return
+                pipe.multi()
+                pipe.setex(self.prefix + key, self.ttl, body)
+                pipe.hset(self.meta_key, key, json.dumps(meta))
+                pipe.execute()
+            except self.watch_error:
+                pass
+
+    def invalidate(self, predicate):
+        self.client.incr(self.generation_key)
+        metas = {k.decode('utf-8'): json.loads(m) for k, m in self.client.hgetall(self.meta_key).items()}
+        if not metas:
+            return 0
+        keys = list(metas)
+        pipe = self.client.pipeline()
+        for key in keys:
+            pipe.exists(self.prefix + key)
+        live = pipe.execute()
+        # Drops the matching entries and the metadata of entries that already expired
+        stale = [key for key, alive in zip(keys, live) if alive and predicate(metas[key])]
+        expired = [key for key, alive in zip(keys, live) if not alive]
+        pipe = self.client.pipeline()
+        if stale:
+            pipe.delete(*[self.prefix + key for key in stale])
+        if stale or expired:
+            pipe.hdel(self.meta_key, *(stale + expired))
+        pipe.execute()
+        return len(stale)
+
+    def clear(self):
+        self.client.incr(self.generation_key)
+        keys = [k.decode('utf-8') for k in self.client.hkeys(self.meta_key)]
+        pipe = self.client.pipeline()
+        if keys:
+            pipe.delete(*[self.prefix + key for key in keys])
+        pipe.delete(self.meta_key)
+        pipe.execute()
+
+    def revisions(self, collection):
+        return SharedRevisionCounter(self.client, self.prefix + 'revision:')
+
+def create_response_cache():
+    # RESPONSE_CACHE_BACKEND: memory (default, per process) or redis (REDIS_URL, shared by workers)
+    if os.getenv('RESPONSE_CACHE_BACKEND', 'memory').lower() == 'redis':
+        return RedisCacheBackend(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    return LocalCacheBackend()
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+import logging
+import os
+import random
+import threading
+from concurrent.futures import wait
+from pymongo import ASCENDING
+
+# How long a claimed retry may stay in flight before another retrier may take it
+RETRY_LEASE_SECONDS = 300
+
+class NotificationRetryQueue:
+    def __init__(self, collection, notification_service, delivery_ledger=None):
+        self.collection = collection
+        self.notification_service = notification_service
+        self.delivery_ledger = delivery_ledger
+        self.max_attempts = int(os.getenv('RETRY_MAX_ATTEMPTS', '5'))
+        self.base_delay = float(os.getenv('RETRY_BASE_DELAY_SECONDS', '60'))
+        self.max_delay = float(os.getenv('RETRY_MAX_DELAY_SECONDS', '3600'))
+        self.batch_size = int(os.getenv('RETRY_BATCH_SIZE', '100'))
+        self.poll_seconds = float(os.getenv('RETRY_POLL_SECONDS', '30'))
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.collection.create_index([('status', ASCENDING), ('next_attempt_at', ASCENDING)])
+        self.collection.create_index([('status', ASCENDING), ('locked_until', ASCENDING)])
+
+    def backoff(self, attempts):
+        # Exponential backoff with +/-50% jitter so failed bursts do not retry in lockstep
+        delay = min(self.max_delay, self.base_delay * (2 ** max(attempts - 1, 0)))
+        return timedelta(seconds=delay * random.uniform(0.5, 1.5))
+
+    def enqueue(self, channel, recipient, message, subject=None, deliveries=None, error=None):
+        now = datetime.utcnow()
+        self.collection.insert_one({
+            'channel': channel,
+            'recipient': recipient,
+            'subject': subject,
+            'message': message,
+            # Ledger entries held as 'retrying' until the send succeeds or is dead-lettered
+            'deliveries': deliveries or [],
+            'attempts': 1,
+            'status': 'pending',
+            'last_error': error,
+            'created_at': now,
+            'next_attempt_at': now + self.backoff(1)
+        })
+
+    def _claim(self, now):
+        due = self.collection.find({
+            '$or': [
+                {'status': 'pending', 'next_attempt_at': {'$lte': now}},
+                {'status': 'processing', 'locked_until': {'$lte': now}}
+            ]
+        }).limit(self.batch_size)
+        claimed = []
+        for entry in due:
+            # Conditional update so concurrent retriers never take the same entry
+            result = self.collection.update_one(
+                {'_id': entry['_id'], 'status': entry['status'], 'attempts': entry['attempts']},
+                {'$set': {'status': 'processing', 'locked_until': now + timedelta(seconds=RETRY_LEASE_SECONDS)}}
+            )
+            if result.modified_count:
+                claimed.append(entry)
+        return claimed
+
+    def process_due(self, now=None):
+        claimed = self._claim(now or datetime.utcnow())
+        if claimed:
+            logging.info(f"Retrying {len(claimed)} failed notifications")
+        futures = []
+        for entry in claimed:
+            on_result = self._on_result(entry)
+            # retry=True keeps these sends out of the scan's pending sends and summary
+            if entry['channel'] == 'email':
+                future = self.notification_service.queue_email_notification(
+                    entry['recipient'], entry['subject'], entry['message'], on_result=on_result, retry=True
+                )
+            else:
+                future = self.notification_service.queue_sms_notification(
+                    entry['recipient'], entry['message'], on_result=on_result, retry=True
+                )
+            if future is not None:
+                futures.append(future)
+        # Waits on the retrier thread only, so the batch settles before the next claim
+        wait(futures)
+        return len(claimed)
+
+    def _on_result(self, entry):
+        def on_result(success):
+            if success:
+                self.collection.delete_one({'_id': entry['_id']})
+                if self.delivery_ledger:
+                    self.delivery_ledger.mark_delivered(entry.get('deliveries', []), entry['channel'])
+                return
+            attempts = entry['attempts'] + 1
+            if attempts >= self.max_attempts:
+                # Dead letter: kept for inspection, never retried again
+                self.collection.update_one(
+                    {'_id': entry['_id']},
+                    {'$set': {'status': 'dead', 'attempts': attempts, 'dead_at': datetime.utcnow()},
+                     '$unset': {'locked_until': ''}}
+                )
+                if self.delivery_ledger:
+                    self.delivery_ledger.release(entry.get('deliveries', []), entry['channel'])
+                logging.error(f"{entry['channel']} notification to {entry['recipient']} dead-lettered after {attempts} attempts")
+            else:
+                self.collection.update_one(
+                    {'_id': entry['_id']},
+                    {'$set': {
+                        'status': 'pending',
+                        'attempts': attempts,
+                        'next_attempt_at': datetime.utcnow() + self.backoff(attempts)
+                    }, '$unset': {'locked_until': ''}}
+                )
+        return on_result
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.process_due()
+            except Exception as e:
+                logging.error(f"Notification retrier error: {str(e)}")
+            self.stop_event.wait(self.poll_seconds)
+
+    def start(self):
+        # Runs beside the scanner so retries never block the scan path
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name='notification-retrier', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
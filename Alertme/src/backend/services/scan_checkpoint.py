@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from pymongo import ASCENDING
+
+# Checkpoints of scans that never completed are dropped after this long
+CHECKPOINT_TTL_SECONDS = 2 * 24 * 60 * 60
+
+class ScanCheckpoint:
+    def __init__(self, collection, interval=1000):
+        # One document per (scan window, kind, partition) holding the last deadline _id whose
+        # sends and ledger entries are durable. Written once every `interval` deadlines.
+        self.collection = collection
+        self.interval = max(interval, 1)
+        self.collection.create_index([('window', ASCENDING), ('partition', ASCENDING)])
+        self.collection.create_index([('expires_at', ASCENDING)], expireAfterSeconds=0)
+        self.window = None
+        self.partition = None
+        self.last_ids = {}
+        self.pending = {}
+
+    def _key(self, kind):
+        partition = 'all' if self.partition is None else self.partition
+        return f"{self.window.isoformat()}:{kind}:{partition}"
+
+    def begin(self, window, partition=None):
+        # window is the scheduled fire time; ad-hoc scans (None) are not checkpointed
+        self.window = window
+        self.partition = partition
+        self.last_ids = {}
+        self.pending = {}
+
+    def resume_after(self, kind):
+        if self.window is None:
+            return None
+        state = self.collection.find_one({'_id': self._key(kind)}, {'last_id': 1})
+        return state.get('last_id') if state else None
+
+    def advance(self, kind, last_id, count):
+        # Called in _id order once everything up to last_id is delivered and flushed
+        self.last_ids[kind] = str(last_id)
+        self.pending[kind] = self.pending.get(kind, 0) + count
+        if self.pending[kind] >= self.interval:
+            self._save(kind)
+
+    def _save(self, kind):
+        if self.window is None:
+            return
+        now = datetime.utcnow()
+        self.collection.update_one(
+            {'_id': self._key(kind)},
+            {'$set': {
+                'window': self.window,
+                'partition': self.partition,
+                'kind': kind,
+                'last_id': self.last_ids[kind],
+                'updated_at': now,
+                'expires_at': now + timedelta(seconds=CHECKPOINT_TTL_SECONDS)
+            }},
+            upsert=True
+        )
+        self.pending[kind] = 0
+
+    def finish(self):
+        # A completed window needs no resume point; the delivery ledger covers re-runs
+        if self.window is not None:
+            self.collection.delete_many({'window': self.window, 'partition': self.partition})
+        self.window = None
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+import heapq
+import itertools
+import logging
+import time
+
+# Longest single sleep, so wall clock jumps are noticed reasonably quickly
+MAX_SLEEP_SECONDS = 300
+
+# A window whose scan failed is run again after this long
+RETRY_DELAY = timedelta(minutes=5)
+
+class ScanScheduler:
+    def __init__(self, job, times, clock=datetime.now, sleep=time.sleep,
+                 state_collection=None, catch_up=timedelta(hours=24), retry_delay=RETRY_DELAY):
+        # times: list of (hour, minute, label) fired daily
+        self.job = job
+        self.times = times
+        self.clock = clock
+        self.sleep = sleep
+        self.state_collection = state_collection
+        self.catch_up = catch_up
+        self.retry_delay = retry_delay
+        # Min-heap of (run_at, seq, (hour, minute, label), fire_at); exposed for tests.
+        # run_at is later than fire_at only for a failed window waiting to be retried
+        self.queue = []
+        self.counter = itertools.count()
+
+    def _next_occurrence(self, hour, minute, after):
+        fire_at = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if fire_at <= after:
+            fire_at += timedelta(days=1)
+        return fire_at
+
+    def _push(self, fire_at, slot, run_at=None):
+        heapq.heappush(self.queue, (run_at or fire_at, next(self.counter), slot, fire_at))
+
+    def _last_fire_at(self):
+        if self.state_collection is None:
+            return None
+        state = self.state_collection.find_one({'_id': 'scan_scheduler'})
+        return state.get('last_fire_at') if state else None
+
+    def _save_last_fire_at(self, fire_at):
+        if self.state_collection is not None:
+            self.state_collection.update_one(
+                {'_id': 'scan_scheduler'},
+                {'$set': {'last_fire_at': fire_at}},
+                upsert=True
+            )
+
+    def start(self, now=None):
+        now = now or self.clock()
+        self.queue = []
+        # Windows missed since the last recorded run are queued as already due
+        last_fire_at = self._last_fire_at()
+        if last_fire_at:
+            since = max(last_fire_at, now - self.catch_up)
+            for hour, minute, label in self.times:
+                fire_at = self._next_occurrence(hour, minute, since)
+                if fire_at <= now:
+                    self._push(fire_at, (hour, minute, label))
+        for hour, minute, label in self.times:
+            self._push(self._next_occurrence(hour, minute, now), (hour, minute, label))
+
+    def next_fire_at(self):
+        return self.queue[0][0] if self.queue else None
+
+    def run_pending(self, now=None):
+        now = now or self.clock()
+        due = []
+        while self.queue and self.queue[0][0] <= now:
+            due.append(heapq.heappop(self.queue))
+        if not due:
+            return 0
+
+        # Missed windows are coalesced into one run for the latest of them
+        _, _, latest_slot, fire_at = max(due, key=lambda entry: entry[3])
+        label = latest_slot[2]
+        if len(due) > 1:
+            logging.info(f"Catching up {len(due)} missed scan windows, running {label} ({fire_at})")
+        try:
+            summary = self.job(fire_at, label)
+        except Exception as e:
+            logging.error(f"Scheduled scan {label} failed: {str(e)}")
+            summary = None
+        if summary:
+            self._save_last_fire_at(fire_at)
+        else:
+            # Scanners return None when a scan fails partway; the window stays owed and its
+            # checkpoint lets the retry resume where the failed run stopped
+            logging.warning(f"Scheduled scan {label} ({fire_at}) did not complete, retrying in {self.retry_delay}")
+            self._push(fire_at, latest_slot, now + self.retry_delay)
+
+        # Re-arm each slot that fired on schedule, skipping any occurrence already due again
+        for run_at, _, slot, slot_fire_at in due:
+            if run_at != slot_fire_at:
+                continue
+            if not any(queued_slot == slot and queued_run_at == queued_fire_at
+                       for queued_run_at, _, queued_slot, queued_fire_at in self.queue):
+                self._push(self._next_occurrence(slot[0], slot[1], now), slot)
+        return 1
+
+    def run_forever(self):
+        self.start()
+        while True:
+            self.run_pending()
+            delay = (self.next_fire_at() - self.clock()).total_seconds()
+            self.sleep(min(max(delay, 0), MAX_SLEEP_SECONDS))
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+import re
+
+DATE_FORMAT = '%Y-%m-%d'
+
+def to_due_at(due_date):
+    # Typed copy of the 'YYYY-MM-DD' due_date string, stored as a BSON date
+    if isinstance(due_date, datetime):
+        return datetime(due_date.year, due_date.month, due_date.day)
+    try:
+        return datetime.strptime(str(due_date), DATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+def due_at_range(date_prefix):
+    # 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD' -> (start, end) for a due_at range query.
+    # Partial fields such as '2024-1' are rejected rather than read as a string prefix.
+    date_prefix = str(date_prefix)
+    try:
+        if re.fullmatch(r'\d{4}', date_prefix):
+            start = datetime(int(date_prefix), 1, 1)
+            return start, datetime(start.year + 1, 1, 1)
+        if re.fullmatch(r'\d{4}-\d{2}', date_prefix):
+            start = datetime.strptime(date_prefix, '%Y-%m')
+            return start, datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+        if re.fullmatch(r'\d{4}-\d{2}-\d{2}', date_prefix):
+            start = datetime.strptime(date_prefix, DATE_FORMAT)
+            return start, start + timedelta(days=1)
+    except ValueError:
+        pass
+    raise ValueError("Invalid date. Use YYYY, YYYY-MM or YYYY-MM-DD")
+
+def due_at_filter(start=None, end=None):
+    # due_at in [start, end) on its index; documents the due_at migration has not reached
+    # yet are matched on the due_date string instead (either bound may be None)
+    due_at, due_date = {}, {}
+    if start:
+        due_at['$gte'], due_date['$gte'] = start, start.strftime(DATE_FORMAT)
+    if end:
+        due_at['$lt'], due_date['$lt'] = end, end.strftime(DATE_FORMAT)
+    return {'$or': [{'due_at': due_at}, {'due_at': {'$exists': False}, 'due_date': due_date}]}
@@ -0,0 +1,32 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+def configure_queue_logging(filename, level=logging.INFO, fmt=LOG_FORMAT):
+    # Like logging.basicConfig(filename=...), but callers only put records on a queue;
+    # a background listener thread does the formatting and file I/O
+    global _listener
+    root = logging.getLogger()
+    if root.handlers:
+        return _listener
+    file_handler = logging.FileHandler(filename)
+    file_handler.setFormatter(logging.Formatter(fmt))
+    log_queue = queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    # Flushes records still queued when the process exits
+    atexit.register(stop_queue_logging)
+    return _listener
+
+def stop_queue_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
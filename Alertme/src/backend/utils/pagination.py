@@ -0,0 +1,34 @@
+import base64
+import json
+from bson import ObjectId
+from bson.errors import InvalidId
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+def page_limit(value):
+    # Missing -> default; clamped to [1, MAX_PAGE_SIZE]; ValueError on non-integers
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    return min(max(int(value), 1), MAX_PAGE_SIZE)
+
+def encode_cursor(due_date, doc_id):
+    # Opaque to clients: the (due_date, _id) of the last row on the page
+    raw = json.dumps([due_date, str(doc_id)]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        due_date, doc_id = json.loads(raw)
+        return due_date, ObjectId(doc_id)
+    except (ValueError, TypeError, InvalidId):
+        raise ValueError('Invalid next token')
+
+def keyset_filter(token, field='due_date'):
+    # Rows strictly after the cursor in (field, _id) order
+    value, doc_id = decode_cursor(token)
+    return {'$or': [
+        {field: {'$gt': value}},
+        {field: value, '_id': {'$gt': doc_id}}
+    ]}
@@ -0,0 +1,20 @@
+import zlib
+
+# Recipients hash into a fixed number of buckets, stored on outbox rows and subscriptions;
+# a scanner worker owns every bucket that maps to its index, for any worker count. The key
+# is the user _id everywhere, so one person never spans two workers
+PARTITION_BUCKETS = 1024
+
+def partition_bucket(key):
+    # Stable across processes, unlike hash()
+    return zlib.crc32(str(key).encode('utf-8')) % PARTITION_BUCKETS
+
+def partition_of(key, partition_count):
+    return partition_bucket(key) % partition_count
+
+def owned_buckets(index, partition_count):
+    return [bucket for bucket in range(PARTITION_BUCKETS) if bucket % partition_count == index]
+
+def bucket_filter(buckets):
+    # Query on the stored bucket; None also matches documents written before buckets were stored
+    return {'$in': list(buckets) + [None]}
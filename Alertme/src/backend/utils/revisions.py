@@ -0,0 +1,54 @@
+import hashlib
+import threading
+import uuid
+
+class RevisionCounter:
+    def __init__(self):
+        # In-process counters bumped by the routes that write each list. The epoch is new
+        # on every start, so tags handed out before a restart never match again.
+        self.epoch = uuid.uuid4().hex[:8]
+        self.revisions = {}
+        self.lock = threading.Lock()
+
+    def current(self, key):
+        return self.revisions.get(key, 0)
+
+    def bump(self, key):
+        with self.lock:
+            self.revisions[key] = self.revisions.get(key, 0) + 1
+
+    def etag(self, key, variant=''):
+        # variant covers whatever else shapes the body (caller, query string)
+        digest = hashlib.sha1(variant.encode('utf-8')).hexdigest()[:12]
+        return f"{self.epoch}-{self.current(key)}-{digest}"
+
+class SharedRevisionCounter(RevisionCounter):
+    def __init__(self, client, prefix):
+        # Counters and epoch live in Redis, so every worker hands out and accepts the same tags
+        self.client = client
+        self.prefix = prefix
+        self.client.set(prefix + 'epoch', uuid.uuid4().hex[:8], nx=True)
+        self.epoch = self.client.get(prefix + 'epoch').decode('utf-8')
+
+    def current(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def bump(self, key):
+        self.client.incr(self.prefix + key)
+
+class MongoRevisionCounter(RevisionCounter):
+    def __init__(self, collection):
+        # Counters kept in Mongo for deployments without Redis, so a write handled by one
+        # worker changes the tags every other worker hands out
+        self.collection = collection
+        self.collection.update_one(
+            {'_id': 'epoch'}, {'$setOnInsert': {'value': uuid.uuid4().hex[:8]}}, upsert=True
+        )
+        self.epoch = self.collection.find_one({'_id': 'epoch'})['value']
+
+    def current(self, key):
+        revision = self.collection.find_one({'_id': key}, {'value': 1})
+        return revision['value'] if revision else 0
+
+    def bump(self, key):
+        self.collection.update_one({'_id': key}, {'$inc': {'value': 1}}, upsert=True)
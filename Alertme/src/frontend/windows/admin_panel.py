@@ -741,25 +741,31 @@ class AdminPanel(QMainWindow):
     def load_govt_deadlines(self):
         try:
             print("Fetching government deadlines...")  # Debug print
-            response = requests.get(
-                'http://localhost:5000/admin/api/government-deadlines',
-                headers={'Authorization': f'Bearer {self.admin_token}'}
-            )
-            
-            print(f"Response status: {response.status_code}")  # Debug print
-            print(f"Response content: {response.text}")  # Debug print
-            
-            if response.status_code == 200:
+            # The list is paginated; follow the next token until the last page
+            params = {'limit': 500}
+            deadlines = []
+            while True:
+                response = requests.get(
+                    'http://localhost:5000/admin/api/government-deadlines',
+                    headers={'Authorization': f'Bearer {self.admin_token}'},
+                    params=params
+                )
+                print(f"Response status: {response.status_code}")  # Debug print
+                if response.status_code != 200:
+                    error_msg = f"Failed to load government deadlines: {response.text}"
+                    print(error_msg)  # Debug print
+                    QMessageBox.warning(self, "Error", error_msg)
+                    return
                 data = response.json()
-                deadlines = data.get('deadlines', [])
-                print(f"Received {len(deadlines)} deadlines")  # Debug print
-                if not deadlines:
-                    print("No deadlines found in response")  # Debug print
-                self.populate_deadlines_table(deadlines)
-            else:
-                error_msg = f"Failed to load government deadlines: {response.text}"
-                print(error_msg)  # Debug print
-                QMessageBox.warning(self, "Error", error_msg)
+                deadlines.extend(data.get('deadlines', []))
+                if not data.get('next'):
+                    break
+                params['next'] = data['next']
+            
+            print(f"Received {len(deadlines)} deadlines")  # Debug print
+            if not deadlines:
+                print("No deadlines found in response")  # Debug print
+            self.populate_deadlines_table(deadlines)
         except Exception as e:
             error_msg = f"An error occurred: {str(e)}"
             print(error_msg)  # Debug print
@@ -779,7 +785,7 @@ class AdminPanel(QMainWindow):
                 department = str(deadline.get('department', ''))
                 due_date = str(deadline.get('due_date', ''))
                 priority = str(deadline.get('priority', ''))
-                subscribers = str(deadline.get('subscribers', []))
+                subscribers = str(deadline.get('subscriber_count', 0))
                 
                 self.deadlines_table.setItem(row, 0, QTableWidgetItem(deadline_id))
                 self.deadlines_table.setItem(row, 1, QTableWidgetItem(title))
@@ -11,7 +11,6 @@ from PyQt6.QtGui import QIcon, QPixmap, QColor, QPalette, QTextCharFormat, QFont
 import requests
 from datetime import datetime, timedelta
 import sys
-from functools import lru_cache
 import threading
 import time
 import math
@@ -132,6 +131,8 @@ class DashboardWindow(QMainWindow):
             'Authorization': f'Bearer {self.user_data.get("token", "")}',
             'Content-Type': 'application/json'
         })
+        # (url, params) -> (ETag, body) of the last full response, revalidated on each poll
+        self.etag_cache = {}
         
         self.data_cache = {
             'personal_deadlines': [],
@@ -842,8 +843,7 @@ class DashboardWindow(QMainWindow):
         try:
             personal_deadlines = self.data_cache['personal_deadlines']
             govt_deadlines = self.data_cache['govt_deadlines']
-            user_email = self.user_data.get('email', '')
-            subscribed_deadlines = [d for d in govt_deadlines if user_email in d.get('subscribers', [])]
+            subscribed_deadlines = [d for d in govt_deadlines if d.get('is_subscribed')]
             all_deadlines = personal_deadlines + subscribed_deadlines
 
             filter_period = self.time_filter.currentText()
@@ -894,19 +894,51 @@ class DashboardWindow(QMainWindow):
         except Exception as e:
             print(f"Error updating analytics display: {str(e)}")
 
-    @lru_cache(maxsize=1)
+    def conditional_get(self, endpoint, params=None):
+        # Sends back the stored ETag; a 304 means the stored body is still current
+        url = f'http://localhost:5000/api/{endpoint}'
+        key = (url, tuple(sorted((params or {}).items())))
+        cached = self.etag_cache.get(key)
+        response = self.session.get(
+            url,
+            params=params,
+            headers={'If-None-Match': cached[0]} if cached else None,
+            timeout=self.request_timeout
+        )
+        if response.status_code == 304 and cached:
+            return cached[1]
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        if response.headers.get('ETag'):
+            self.etag_cache[key] = (response.headers['ETag'], data)
+        return data
+
     def fetch_api_data(self, endpoint, params=None):
         try:
-            response = self.session.get(
-                f'http://localhost:5000/api/{endpoint}',
-                params=params,
-                timeout=self.request_timeout
-            )
-            return response.json() if response.status_code == 200 else []
+            data = self.conditional_get(endpoint, params)
+            return data if data is not None else []
         except requests.RequestException as e:
             print(f"API fetch error for {endpoint}: {str(e)}")
             return []
 
+    def fetch_all_pages(self, endpoint, params=None):
+        # List endpoints return one page per request; follow the next token to the end
+        params = dict(params or {}, limit=500)
+        items = []
+        try:
+            while True:
+                data = self.conditional_get(endpoint, params)
+                if data is None:
+                    break
+                items.extend(data.get('deadlines', []))
+                if not data.get('next'):
+                    break
+                params['next'] = data['next']
+        except requests.RequestException as e:
+            print(f"API fetch error for {endpoint}: {str(e)}")
+        return items
+
     def load_dashboard_data_async(self):
         if self.is_loading:
             return
@@ -918,7 +950,7 @@ class DashboardWindow(QMainWindow):
             current_time = time.time()
             if current_time - self.data_cache['last_updated'] > self.cache_timeout:
                 personal_deadlines = self.fetch_api_data('personal-deadlines')
-                govt_deadlines = self.fetch_api_data('government-deadlines/public').get('deadlines', [])
+                govt_deadlines = self.fetch_all_pages('government-deadlines/public')
                 self.data_cache.update({
                     'personal_deadlines': personal_deadlines,
                     'govt_deadlines': govt_deadlines,
@@ -1011,9 +1043,7 @@ class DashboardWindow(QMainWindow):
         subscribe_layout.setSpacing(8)
         
         subscribe_cb = QCheckBox("Subscribe")
-        user_email = self.user_data.get('email', '')
-        subscribers = deadline.get('subscribers', [])
-        subscribe_cb.setChecked(user_email in subscribers)
+        subscribe_cb.setChecked(bool(deadline.get('is_subscribed')))
         subscribe_cb.stateChanged.connect(lambda state: self.toggle_govt_deadline_subscription(deadline_id, state))
         subscribe_layout.addWidget(subscribe_cb)
         subscribe_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -1152,8 +1182,7 @@ class DashboardWindow(QMainWindow):
         try:
             personal_deadlines = self.data_cache['personal_deadlines']
             govt_deadlines = self.data_cache['govt_deadlines']
-            user_email = self.user_data.get('email', '')
-            subscribed_deadlines = [d for d in govt_deadlines if user_email in d.get('subscribers', [])]
+            subscribed_deadlines = [d for d in govt_deadlines if d.get('is_subscribed')]
 
             total_tasks = len(personal_deadlines) + len(subscribed_deadlines)
             in_progress = len([d for d in personal_deadlines if d.get('status', '').lower() == 'in_progress'])
@@ -1193,8 +1222,7 @@ class DashboardWindow(QMainWindow):
             for row, deadline in enumerate(govt_deadlines):
                 self.add_deadline_to_govt_table(row, deadline)
             
-            user_email = self.user_data.get('email', '')
-            subscribed_deadlines = [d for d in govt_deadlines if user_email in d.get('subscribers', [])]
+            subscribed_deadlines = [d for d in govt_deadlines if d.get('is_subscribed')]
             self.subscribed_table.setRowCount(len(subscribed_deadlines))
             for row, deadline in enumerate(subscribed_deadlines):
                 self.add_deadline_to_subscribed_table(row, deadline)
@@ -1291,8 +1319,7 @@ class DashboardWindow(QMainWindow):
             self.date_deadlines.clear()
             personal_deadlines = self.data_cache['personal_deadlines']
             govt_deadlines = self.data_cache['govt_deadlines']
-            user_email = self.user_data.get('email', '')
-            subscribed_deadlines = [d for d in govt_deadlines if user_email in d.get('subscribers', [])]
+            subscribed_deadlines = [d for d in govt_deadlines if d.get('is_subscribed')]
             all_deadlines = personal_deadlines + subscribed_deadlines
             
             selected_date_str = selected_date.toString("yyyy-MM-dd")
@@ -1348,8 +1375,7 @@ class DashboardWindow(QMainWindow):
         response = ""
         if selected_text.lower() == "show my deadlines":
             personal_deadlines = self.data_cache['personal_deadlines']
-            user_email = self.user_data.get('email', '')
-            subscribed_deadlines = [d for d in self.data_cache['govt_deadlines'] if user_email in d.get('subscribers', [])]
+            subscribed_deadlines = [d for d in self.data_cache['govt_deadlines'] if d.get('is_subscribed')]
             all_deadlines = personal_deadlines + subscribed_deadlines
             if all_deadlines:
                 response = "🤖 Your deadlines:\n" + "\n".join([f"- {d.get('title', 'N/A')} (Due: {d.get('due_date', 'N/A')})" for d in all_deadlines])
@@ -1363,8 +1389,7 @@ class DashboardWindow(QMainWindow):
             else:
                 response = "🤖 No government deadlines available."
         elif selected_text.lower() == "unsubscribe from a deadline":
-            user_email = self.user_data.get('email', '')
-            subscribed_deadlines = [d for d in self.data_cache['govt_deadlines'] if user_email in d.get('subscribers', [])]
+            subscribed_deadlines = [d for d in self.data_cache['govt_deadlines'] if d.get('is_subscribed')]
             if subscribed_deadlines:
                 response = "🤖 Your subscribed deadlines:\n" + "\n".join([f"- {d.get('title', 'N/A')} (ID: {d.get('_id', d.get('id', ''))})" for d in subscribed_deadlines])
                 response += "\nPlease type 'unsubscribe <deadline_id>' to unsubscribe (e.g., 'unsubscribe 123')."
@@ -1403,8 +1428,7 @@ class DashboardWindow(QMainWindow):
                 response = "🤖 Invalid deadline ID. Please check the ID from the 'Subscribe to a deadline' list."
         elif query.startswith("unsubscribe "):
             deadline_id = query.replace("unsubscribe ", "").strip()
-            user_email = self.user_data.get('email', '')
-            subscribed_deadlines = [d for d in self.data_cache['govt_deadlines'] if user_email in d.get('subscribers', [])]
+            subscribed_deadlines = [d for d in self.data_cache['govt_deadlines'] if d.get('is_subscribed')]
             deadline = next((d for d in subscribed_deadlines if str(d.get('_id', d.get('id', ''))) == deadline_id), None)
             if deadline:
                 self.toggle_govt_deadline_subscription(deadline_id, False)